@@ -1,28 +1,113 @@
+import os
+import tempfile
+
 from flask import Flask
 from flask_mongoengine import MongoEngine
 from flask_login import LoginManager
 
+# registers the MongoDB command listener, which must happen before connecting
+import metrics  # noqa: F401
+
+
+def create_app(profile=None):
+    """Create the Flask app, configured from the environment.
+
+    The configuration profile ("development" or "production") is read from `APP_ENV` unless given,
+    and any setting can be overridden by a Python config file named by `APP_CONFIG`.
 
-def create_app():
+    Args:
+        profile (Optional[str]): Configuration profile, defaults to `APP_ENV` or "development".
+
+    Returns:
+        Tuple[Flask, MongoEngine, LoginManager]: The app, its database and its login manager.
+    """
+    profile = profile or os.environ.get("APP_ENV", "development")
     # create an instance of the Flask WSGI application
     app = Flask(__name__)
-    # defining the database URI
-    app.config["MONGODB_SETTINGS"] = {"db": "eca", "host": "mongodb"}
+    # defining the database connection, the host is either a host name or a URI (including the database)
+    # `connect=False` defers connecting to the first query, so pre-forked workers each open their own
+    # connections rather than sharing the sockets of the parent process
+    app.config["MONGODB_SETTINGS"] = {
+        "db": os.environ.get("MONGODB_DB", "eca"),
+        "host": os.environ.get("MONGODB_HOST", "mongodb"),
+        "connect": False,
+        # connections per worker process, shared by its threads
+        "maxPoolSize": int(os.environ.get("MONGODB_POOL_SIZE", 50)),
+        # fail requests fast when MongoDB is unreachable, rather than after pymongo's 30s default
+        "serverSelectionTimeoutMS": 5000,
+        "connectTimeoutMS": 5000,
+        "socketTimeoutMS": 30000,
+    }
     # setting path for all static files in application
     app.static_folder = "assets"
-    app.config["TEMPLATES_AUTO_RELOAD"] = True
+    # templates are only checked for changes (on every render) in development
+    app.config["TEMPLATES_AUTO_RELOAD"] = profile != "production"
+    # serve static assets fingerprinted by `flask build-assets` (see `static_assets.py`) in production
+    app.config["FINGERPRINT_ASSETS"] = profile == "production"
+    # number of CSV rows written to the database per bulk insert on /upload
+    app.config["UPLOAD_BATCH_SIZE"] = 1000
+    # number of uploads processed concurrently in the background, and where uploads are spooled
+    app.config["UPLOAD_WORKERS"] = 2
+    app.config["UPLOAD_SPOOL_DIR"] = os.path.join(
+        tempfile.gettempdir(), "staycation-uploads"
+    )
+    # number of processes hashing passwords of uploaded users, defaults to the number of CPUs
+    app.config["UPLOAD_HASH_WORKERS"] = os.cpu_count() or 1
+    # default and maximum number of items per page, for paginated lists
+    app.config["PAGE_SIZE"] = 20
+    app.config["PAGE_SIZE_MAX"] = 100
+    # number of rooms available per check-in date, for staycation packages without `rooms`
+    app.config["DEFAULT_ROOMS"] = 10
+    # how long (in seconds) data versions are memoised in-process, i.e. how long other
+    # processes may serve cached results after a write
+    app.config["DATA_VERSION_TTL"] = 1.0
+    # how long (in seconds) the staycation catalog is cached in memory
+    app.config["CATALOG_CACHE_TTL"] = 300
+    # catalog search terms are matched with the MongoDB text index ("text"), or with an in-memory
+    # inverted index of the catalog ("inverted"), e.g. for servers without text search
+    app.config["CATALOG_SEARCH"] = os.environ.get("CATALOG_SEARCH", "text")
+    # default maximum number of dates (x-axis labels) on the trend chart (downsampled beyond)
+    app.config["TREND_CHART_MAX_POINTS"] = 366
+    # number of dashboard chart payloads cached in memory, and for how long (in seconds)
+    app.config["CHART_CACHE_SIZE"] = 128
+    app.config["CHART_CACHE_TTL"] = 300
+    # number of logged in users cached in memory, and for how long (in seconds)
+    app.config["USER_CACHE_SIZE"] = 1024
+    app.config["USER_CACHE_TTL"] = 60
+    # number of MongoDB commands a request may send before it is logged as a warning (e.g. N+1 queries)
+    app.config["QUERY_BUDGET"] = 20
+    # report the number of MongoDB commands and database time of each request in response headers
+    app.config["QUERY_DEBUG_HEADER"] = profile != "production"
+    # count BSON bytes sent to and received from MongoDB in `/metrics`, off by default as it
+    # re-encodes every command and reply
+    app.config["QUERY_COUNT_BYTES"] = False
+    # login and register attempts allowed per client IP and per email, as (burst, period in seconds),
+    # so credential stuffing cannot use up the CPU with password hashing
+    app.config["RATE_LIMIT_ENABLED"] = True
+    app.config["RATE_LIMIT_BY_IP"] = (20, 60)
+    app.config["RATE_LIMIT_BY_EMAIL"] = (5, 60)
+    # rate limits are kept in memory per worker ("memory"), or shared by all workers through a
+    # local SQLite database ("sqlite", at `RATE_LIMIT_PATH`)
+    app.config["RATE_LIMIT_BACKEND"] = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    app.config["RATE_LIMIT_PATH"] = os.path.join(
+        tempfile.gettempdir(), "staycation-ratelimit.db"
+    )
+    # maximum number of keys (client IPs and emails) tracked in memory, per worker
+    app.config["RATE_LIMIT_MAX_KEYS"] = 100000
+    # define secret key to use session, encrpyt cookies to browser
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "90LWxND4o83j4K4iuop0")
+    # settings overridden by a config file, e.g. `APP_CONFIG=/etc/staycation.cfg`
+    app.config.from_envvar("APP_CONFIG", silent=True)
     # setting up mongodb after app is initialise
     db = MongoEngine(app)
 
-    # define secret key to use session, encrpyt cookies to browser
-    app.config["SECRET_KEY"] = "90LWxND4o83j4K4iuop0"
     # enabling user management with LoginManager
     # logging in, logging out and remembering session
     login_manager = LoginManager()
     # configure login manager to work with initialised flask app
     login_manager.init_app(app)
     # view where user is redirected to when user is not logged in
-    login_manager.login_view = "login"
+    login_manager.login_view = "auth.login"
 
     return app, db, login_manager
 
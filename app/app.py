@@ -1,17 +1,20 @@
-from csv import DictReader
-from io import StringIO
 from typing import Callable
 
-from flask import render_template, request
+from bson import ObjectId
+from flask import Response, abort, jsonify, render_template, request
 from flask_login import login_required
-from werkzeug.security import generate_password_hash
 
 from app import app, login_manager
 from auth import auth
-from book import booking, Booking
-from dashboard import dashboard
-from staycation import staycation, Staycation
-from users import User
+from book import booking
+from dashboard import chart_cache, dashboard
+from indexes import ensure_indexes_command, explain_queries_command  # noqa: F401
+from jobs import UploadJob, submit_upload
+from metrics import init_metrics, query_metrics
+from ratelimit import limiter
+from static_assets import init_assets
+from staycation import staycation
+from users import User, load_session_user, user_cache
 
 # register authentication-related operations
 app.register_blueprint(auth)
@@ -21,6 +24,10 @@ app.register_blueprint(booking)
 app.register_blueprint(staycation)
 # register dashboard-related operations
 app.register_blueprint(dashboard)
+# record the MongoDB commands sent by each request
+init_metrics(app)
+# serve fingerprinted static assets, if built
+init_assets(app)
 
 
 # load current user if (any)
@@ -28,13 +35,15 @@ app.register_blueprint(dashboard)
 def load_user(user_id) -> User:
     """Retrieve current user credentials.
 
+    Users are cached in memory (see `users.user_cache`), so most requests do not query the database.
+
     Args:
         user_id (str): _id of User object in `User` document.
 
     Returns:
-        User: User object.
+        User: User object, without the password.
     """
-    return User.objects(pk=user_id).first()
+    return load_session_user(user_id)
 
 
 @app.route("/")
@@ -47,59 +56,13 @@ def show_base() -> Callable[[str], str]:
     return render_template("base.html")
 
 
-def _upload_db_processing_logic(reader: DictReader, file_type: str) -> None:
-    """Perform file processing logic to generate appropriate data model objects in either,
-    ["Staycation", "Booking", "User"].items
-
-    For each data model, objects are to processed seperately based on different fields required.
-
-    Args:
-        reader (DictReader): Reader for CSV file uploaded, with fields as keys in dictionary.
-        file_type (str): Type of file uploaded, either "Staycations", "Bookings" or "Users".
-    """
-    for item in list(reader):
-        if file_type == "staycation":
-            # create staycation document
-            staycation = Staycation(**item)
-            # save to db
-            staycation.save()
-        elif file_type == "booking":
-            # preprocessing to retrieve user and staycation references
-            user_ref = User.objects(email=item["customer"]).first()
-            staycation_ref = Staycation.objects(hotel_name=item["hotel_name"]).first()
-            # update the data dict required
-            updated_item = {
-                "check_in_date": item["check_in_date"],
-                "customer": user_ref,
-                "package": staycation_ref,
-            }
-            # create booking document
-            booking = Booking(**updated_item)
-            # compute total cost of booking and update
-            booking.calculate_total_cost()
-            # save to db
-            booking.save()
-        else:
-            # retrieve number of users with same email
-            # that is about to be created and stored in DB
-            existing_user = User.objects(email=item["email"]).count()
-            # if no existing user available, create new user
-            if not existing_user:
-                hashpass = generate_password_hash(item["password"], method="sha256")
-                credentials = User(
-                    email=item["email"], password=hashpass, name=item["name"]
-                )
-                # save to db
-                credentials.save()
-
-
 @app.route("/upload", methods=["GET", "POST"])
 @login_required
 def upload() -> Callable[[str, str, str], str]:
     """Upload route endpoint.
 
-    Handles logic to pre-process CSV file and upload to MongoDB, for various file types
-    in ["Staycation", "Booking", "User"].
+    Handles logic to spool CSV file to disk and queue it for upload to MongoDB in the background,
+    for various file types in ["Staycation", "Booking", "User"] (see `jobs.process_upload`).
 
     Args:
         GET: /upload
@@ -109,18 +72,70 @@ def upload() -> Callable[[str, str, str], str]:
         Callable[[str, str, str], str]: Renders the upload page using `upload.hmtl` template.
     """
     if request.method == "POST":
-        # retrieve file uploaded and read data into DictReader
+        # retrieve file uploaded
         file = request.files.get("file")
         # `file_type` determines which data model to use for processing
         # and saving to document collection
         file_type = request.form.get("datatype")
-        data = file.read().decode("utf-8")
-        reader = DictReader(StringIO(data), delimiter=",", quotechar='"')
-        # conduct processing logic for file uploaded based on specified file type
-        _upload_db_processing_logic(reader, file_type)
+        # number of rows per bulk insert, defaults to `UPLOAD_BATCH_SIZE` in app config
+        batch_size = request.form.get(
+            "batch_size", app.config["UPLOAD_BATCH_SIZE"], type=int
+        )
+        # queue processing logic for file uploaded based on specified file type
+        job = submit_upload(file, file_type, batch_size)
+        return render_template("upload.html", panel="Upload", job=job)
     # return upload html page by default if GET request
     return render_template("upload.html", panel="Upload")
 
 
+@app.route("/upload/jobs/<job_id>")
+@login_required
+def upload_job_status(job_id: str) -> Callable[[dict], dict]:
+    """Upload job status route endpoint.
+
+    Args:
+        GET: /upload/jobs/<job_id>
+        job_id (str): _id of the `UploadJob`, returned on upload.
+
+    Returns:
+        Callable[[dict], dict]: Json payload of the job status, rows done, rows failed and throughput.
+    """
+    if not ObjectId.is_valid(job_id):
+        abort(404)
+    job = UploadJob.objects.get_or_404(id=job_id)
+    return jsonify(job.to_status())
+
+
+@app.route("/cache_stats")
+@login_required
+def cache_stats() -> Callable[[dict], dict]:
+    """In-memory cache statistics route endpoint.
+
+    Args:
+        GET: /cache_stats
+
+    Returns:
+        Callable[[dict], dict]: Json payload of entries, hits and misses for each cache.
+    """
+    return jsonify({"users": user_cache.stats(), "charts": chart_cache.stats()})
+
+
+@app.route("/metrics")
+def metrics() -> Response:
+    """MongoDB command and rate limiter metrics route endpoint, for scraping by Prometheus.
+
+    Args:
+        GET: /metrics
+
+    Returns:
+        Response: Commands, database time and bytes per endpoint, and rate limited requests,
+            in Prometheus text format.
+    """
+    return Response(
+        query_metrics.to_prometheus() + limiter.to_prometheus(),
+        mimetype="text/plain; version=0.0.4",
+    )
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
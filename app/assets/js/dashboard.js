@@ -1,81 +1,100 @@
 // retrieve canvas element from `trend_chart.html` to plot trend chart for hotel booking income.
 var ctx = document.getElementById('trend_chart').getContext('2d')
+// chart currently drawn on the canvas, replaced when the window or granularity changes
+var trendChart = null;
 
 /**
- * [Function to map hotel income data in appropriate format for chart.js]
- * @param  {[Array]} num Array for hotel booking income, where -1 is for no data.
- * @return {[Number|Null]}       null, if no data, else return the actual hotel booking income.
+ * [Function to map sparse hotel income data in appropriate format for chart.js]
+ * @param  {[Object]} series Positions (`x`, in the x-axis labels) and hotel booking income (`y`) of dates with data.
+ * @param  {[Number]} length Number of x-axis labels.
+ * @return {[Array]}       Hotel booking income for each x-axis label, null if no data.
  */
-function replaceMissingData(num) {
-    if (num == -1)
-        return null;
-    else
-        return num;
+function expandSeries(series, length) {
+    var values = new Array(length).fill(null);
+    series.x.forEach(function (column, i) {
+        values[column] = series.y[i];
+    });
+    return values;
 }
 
-$.ajax({
-    url: "/dashboard/trend_chart",
-    type: "POST",
-    data: {},
-    error: function () {
-        alert("Error. Issues with loading data, please refresh the page!");
-    },
-    success: function (data, status, xhr) {
+/**
+ * [Function to (re)load the trend chart for the window and granularity selected]
+ */
+function loadTrendChart() {
+    $.ajax({
+        // conditional GET, so an unchanged chart is answered with `304 Not Modified` from the browser cache
+        url: "/api/charts/trend_chart",
+        type: "GET",
+        data: $("#trend_chart_options").serialize() + "&format=sparse",
+        error: function () {
+            alert("Error. Issues with loading data, please refresh the page!");
+        },
+        success: function (data, status, xhr) {
 
-        var hotelBookingsIncome = {};
+            var hotelBookingsIncome = {};
 
-        // retrieve hotel booking income data (chart dimension) and x-axis labels (chart labels).
-        var hotelBookingsIncome = data.chartDim;
-        var dateLabels = data.labels;
-        console.log(dateLabels)
+            // retrieve hotel booking income data (chart dimension) and x-axis labels (chart labels).
+            var hotelBookingsIncome = data.series;
+            var dateLabels = data.labels;
+            console.log(dateLabels)
 
-        var incomeLabels = [];
-        var incomeData = [];
+            var incomeLabels = [];
+            var incomeData = [];
 
-        for (const [key, values] of Object.entries(hotelBookingsIncome)) {
-            incomeLabels.push(key);
-            let newValues = values.map(replaceMissingData);
-            incomeData.push(newValues);
-        }
+            for (const [key, values] of Object.entries(hotelBookingsIncome)) {
+                incomeLabels.push(key);
+                let newValues = expandSeries(values, dateLabels.length);
+                incomeData.push(newValues);
+            }
 
-        // given existing canvas element, create a trend chart for display of income data
-        var trendChart = new Chart(ctx, {
-            type: "line",
-            data: {
-                labels: dateLabels,
-                datasets: []
-            },
-            options: {
-                responsive: true,
-                maintainaspectratio: false,
-                scales: {
-                    y: {
-                        ticks: {
-                            beginAtZero: true,
-                        }
-                    },
-                    x: {
-                        ticks: {
-                            autoSkip: true,
-                            padding: 10
+            // given existing canvas element, create a trend chart for display of income data
+            if (trendChart != null)
+                trendChart.destroy();
+            trendChart = new Chart(ctx, {
+                type: "line",
+                data: {
+                    labels: dateLabels,
+                    datasets: []
+                },
+                options: {
+                    responsive: true,
+                    maintainaspectratio: false,
+                    scales: {
+                        y: {
+                            ticks: {
+                                beginAtZero: true,
+                            }
+                        },
+                        x: {
+                            ticks: {
+                                autoSkip: true,
+                                padding: 10
+                            }
                         }
                     }
                 }
+            });
+
+            // iterate through all the income labels (all hotels has same length in processed income data)
+            for (i = 0; i < incomeLabels.length; i++) {
+                trendChart.data.datasets.push({
+                    label: incomeLabels[i],
+                    type: "line",
+                    borderColor: '#' + (0x1100000 + Math.random() * 0xffffff).toString(16).substr(1, 6),
+                    backgroundColor: "rgba(249, 238, 236, 0.74)",
+                    data: incomeData[i],
+                    spanGaps: true
+                });
+                trendChart.update();
             }
-        });
 
-        // iterate through all the income labels (all hotels has same length in processed income data)
-        for (i = 0; i < incomeLabels.length; i++) {
-            trendChart.data.datasets.push({
-                label: incomeLabels[i],
-                type: "line",
-                borderColor: '#' + (0x1100000 + Math.random() * 0xffffff).toString(16).substr(1, 6),
-                backgroundColor: "rgba(249, 238, 236, 0.74)",
-                data: incomeData[i],
-                spanGaps: true
-            });
-            trendChart.update();
         }
+    })
+}
+
+$("#trend_chart_options").on("submit", function (event) {
+    event.preventDefault();
+    loadTrendChart();
+});
 
-    }
-})
\ No newline at end of file
+loadTrendChart();
@@ -6,10 +6,10 @@ $(document).ready(function () {
     $('#hotelname').change(function () {
         var hotelname = $('#hotelname').val();
         $.ajax({
-            url: '/dashboard/bar_chart_by_hotel',
-            type: 'POST',
+            url: '/api/charts/due_by/hotel',
+            type: 'GET',
             data: {
-                hotelname: hotelname
+                target: hotelname
             },
             success: function (data) {
 
@@ -28,7 +28,7 @@ $(document).ready(function () {
                     chartStatus.destroy()
                 }
 
-                if (due_target != "Select One") {
+                if (due_target && due_target != "Select One") {
 
                     // given existing canvas element, create a trend chart for display of income data
                     var barChart = new Chart(ctx, {
@@ -0,0 +1,30 @@
+/**
+ * [Typeahead for inputs with a `data-typeahead` attribute, e.g. the dashboard selectors]
+ * As the user types, names starting with the input value are retrieved from the `data-typeahead`
+ * endpoint (e.g. `/api/names/user`), and replace the options of the input's datalist.
+ */
+$(document).ready(function () {
+    $('input[data-typeahead]').each(function () {
+        var input = $(this);
+        var datalist = $('#' + input.attr('list'));
+        var timer = null;
+
+        input.on('input', function () {
+            // wait for the user to stop typing, rather than sending a request per key stroke
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                $.ajax({
+                    url: input.data('typeahead'),
+                    type: 'GET',
+                    data: { prefix: input.val(), limit: 20 },
+                    success: function (data) {
+                        datalist.empty();
+                        data.names.forEach(function (name) {
+                            datalist.append($('<option>').attr('value', name));
+                        });
+                    }
+                });
+            }, 200);
+        });
+    });
+});
@@ -6,7 +6,8 @@ from werkzeug.security import check_password_hash, generate_password_hash
 
 from app import app
 from forms import RegForm
-from users import User
+from ratelimit import rate_limited
+from users import User, user_cache
 
 # record authentication-related operations
 auth = Blueprint("auth", __name__)
@@ -14,12 +15,14 @@ auth = Blueprint("auth", __name__)
 
 @auth.route("/login", methods=["GET", "POST"])
 @auth.route("/")
+@rate_limited
 def login() -> Union[
     Callable[[Callable[[str], str]], Response], Callable[[str, RegForm, str], str]
 ]:
     """Login route endpoint.
 
-    Handles the staycation portal login template and logic.
+    Handles the staycation portal login template and logic. Login attempts are rate limited
+    by client IP and email (see `ratelimit.rate_limited`).
 
     Args:
         GET: /login
@@ -50,12 +53,14 @@ def login() -> Union[
 
 # QN1B, QN2A
 @auth.route("/register", methods=["GET", "POST"])
+@rate_limited
 def register() -> Union[
     Callable[[Callable[[str], str]], Response], Callable[[str, RegForm, str], str]
 ]:
     """Register route endpoint.
 
-    Handles the staycation portal registration template and logic.
+    Handles the staycation portal registration template and logic. Registrations are rate limited
+    by client IP and email (see `ratelimit.rate_limited`).
 
     Args:
         GET: /register
@@ -78,6 +83,8 @@ def register() -> Union[
             )
             # save to `Users` collection
             credentials.save()
+            # drop any cached record for the new user id
+            user_cache.invalidate(str(credentials.pk))
             app.logger.info(f"New User Created: {credentials.email}")
             login_user(credentials)
             # redirect logged in user to package page
@@ -1,12 +1,22 @@
-from typing import Callable
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from uuid import uuid4
 
-from flask import Blueprint, render_template, request
-from flask_login import current_user
+import click
+from bson import DBRef, ObjectId
+from flask import Blueprint, abort, jsonify, render_template, request
+from flask_login import current_user, login_required
+from mongoengine import NotUniqueError, Q
+from pymongo import UpdateOne
 
 from app import app, db
+from cache import DataVersion
 from forms import BookingForm
+from inventory import RoomInventory, SoldOutError
+from pagination import page_size
 from users import User
-from staycation import Staycation
+from staycation import Staycation, find_staycation
 
 # record all operations to execute when booking related operations are performed
 booking = Blueprint("booking", __name__)
@@ -31,10 +41,31 @@ class Booking(db.Document):
         2. `customer`: The `User` object that made the booking, identifed by the `customer`, corresponding to `customer` in raw data.
         3. `package`: The `Staycation` object booked, identifed by the `hotel_name`, corresponding to `hotel_name` in raw data.
         4. `total_cost`: Computed given `package` field, with `package.unit_cost` and `package.duration`, using `calculate_total_cost()` method.
+
+    Bookings made on the portal also carry an `idempotency_key` (unique per customer), so retried
+    requests do not create duplicate bookings.
+
+    Each booking also keeps a snapshot of `hotel_name`, `customer_name`, `unit_cost` and `duration` at
+    booking time (see `take_snapshot()`), so analytics queries run on the `booking` collection alone,
+    without dereferencing `customer` and `package`. Bookings written before the snapshot fields existed
+    are backfilled with `flask backfill-bookings`, and renamed hotels are kept consistent by `rename_staycation()`.
     """
 
     # all `Booking` objects are stored as documents in collection `booking`
-    meta = {"collection": "booking"}
+    # indexed by `customer` and `package` (then `check_in_date`), to query bookings of a single user or hotel
+    meta = {
+        "collection": "booking",
+        "indexes": [
+            # `_id` breaks ties of `check_in_date`, for the keyset pagination of a user's bookings
+            {"fields": ["customer", "check_in_date", "id"]},
+            {"fields": ["package", "check_in_date"]},
+            # snapshot names, to count bookings due by user or hotel without dereferencing
+            {"fields": ["customer_name"]},
+            {"fields": ["hotel_name"]},
+            # sparse, as bookings uploaded from CSV files have no idempotency key
+            {"fields": ["idempotency_key"], "unique": True, "sparse": True},
+        ],
+    }
     # mandatory DateTime field for the `Booking` object, corresponding to `check_in_date` in raw data
     # `check_in_date` field is a DateTime object, which is a Python datetime object, formatted as (%Y-%m-%d %H:%M:%S)
     check_in_date = db.DateTimeField(required=True)
@@ -45,6 +76,21 @@ class Booking(db.Document):
     # computed using the `calculate_total_cost()` method, referencing to `package` field
     # `total_cost` field is a Float field, which is a Python float object
     total_cost = db.FloatField()
+    # client-generated key identifying the booking request, prefixed with the customer id
+    idempotency_key = db.StringField()
+    # snapshot of the `customer` and `package` at booking time, set by the `take_snapshot()` method
+    customer_name = db.StringField()
+    hotel_name = db.StringField(max_length=30)
+    unit_cost = db.FloatField()
+    duration = db.IntField()
+
+    def take_snapshot(self) -> None:
+        """Copy the customer name, and the hotel name, daily unit cost and stay duration of the package
+        to the booking, as they are at booking time."""
+        self.customer_name = self.customer.name
+        self.hotel_name = self.package.hotel_name
+        self.unit_cost = self.package.unit_cost
+        self.duration = self.package.duration
 
     def calculate_total_cost(self) -> float:
         """Compute total cost of the booking, given the hotel's daily unit cost and the minimum stay duration.
@@ -60,8 +106,419 @@ class Booking(db.Document):
         """
         self.total_cost = self.package.duration * self.package.unit_cost
 
+    def save(self, *args, **kwargs) -> "Booking":
+        """Save the booking, and add its total cost to the `DailyRevenue` rollup if it is a new booking.
+
+        Returns:
+            Booking: The saved booking.
+        """
+        created = self.id is None
+        super().save(*args, **kwargs)
+        if created:
+            DailyRevenue.record([self])
+            DataVersion.bump("booking")
+        return self
+
+
+class DailyRevenue(db.Document):
+    """Daily revenue rollup data model.
+
+    The `DailyRevenue` data model keeps the total booking income of each staycation package by check-in date,
+    so the dashboard reads O(hotels x days) documents instead of every `Booking`.
+    All rollup documents are stored in the database, under the collection `dailyRevenue`.
+
+    The rollup is maintained incrementally with `$inc` whenever bookings are written (see `Booking.save()` and
+    `ingest.BulkIngestor`), and can be backfilled from the `booking` collection with `flask rebuild-revenue`.
+
+    The required fields of the `DailyRevenue` document are:
+        1. `package`: The `Staycation` object booked.
+        2. `date`: The check-in date of the bookings, formatted as "YYYY-MM-DD".
+        3. `total_income`: Sum of `total_cost` for all bookings of the package on the date.
+    """
+
+    # one rollup document per (package, date)
+    meta = {
+        "collection": "dailyRevenue",
+        "indexes": [{"fields": ["package", "date"], "unique": True}],
+    }
+    package = db.ReferenceField(Staycation)
+    date = db.StringField(required=True)
+    total_income = db.FloatField(default=0.0)
+
+    @classmethod
+    def record(cls, bookings: Iterable[Booking]) -> None:
+        """Add the total cost of new bookings to the rollup, with a single unordered bulk write of
+        upserted `$inc` updates (one per package and date).
+
+        Args:
+            bookings (Iterable[Booking]): Bookings that were just written to the database.
+        """
+        income_by_package_and_date = defaultdict(float)
+        for booking in bookings:
+            if booking.package is None or not booking.total_cost:
+                continue
+            # `check_in_date` may still be a raw string for bookings built from CSV rows
+            date = Booking.check_in_date.to_mongo(booking.check_in_date)
+            key = (booking.package.pk, date.strftime("%Y-%m-%d"))
+            income_by_package_and_date[key] += booking.total_cost
+        if not income_by_package_and_date:
+            return
+        cls._get_collection().bulk_write(
+            [
+                UpdateOne(
+                    {"package": package, "date": date},
+                    {"$inc": {"total_income": total_income}},
+                    upsert=True,
+                )
+                for (package, date), total_income in income_by_package_and_date.items()
+            ],
+            ordered=False,
+        )
+
+    @classmethod
+    def income_by_hotel(
+        cls, start: Optional[str] = None, end: Optional[str] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """Read the rollup as the total booking income for each hotel by date.
+
+        Args:
+            start (Optional[str]): Earliest date ("YYYY-MM-DD") to read, defaults to the first date.
+            end (Optional[str]): Latest date ("YYYY-MM-DD") to read, defaults to the last date.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Total booking income by hotels and dates.
+        """
+        # dates are stored as "YYYY-MM-DD", so string comparison follows date order
+        window = {}
+        if start:
+            window["$gte"] = start
+        if end:
+            window["$lte"] = end
+        query = {"date": window} if window else {}
+        rows = list(cls._get_collection().find(query, {"_id": 0}))
+        # resolve all hotel names with a single query
+        hotel_names = {
+            staycation.pk: staycation.hotel_name
+            for staycation in Staycation.objects(
+                id__in={row["package"] for row in rows}
+            ).only("hotel_name")
+        }
+        booking_income_by_hotels = {}
+        for row in rows:
+            hotel = hotel_names.get(row["package"])
+            if hotel is None:
+                continue
+            income_by_date = booking_income_by_hotels.setdefault(hotel, {})
+            income_by_date[row["date"]] = (
+                income_by_date.get(row["date"], 0.0) + row["total_income"]
+            )
+        return booking_income_by_hotels
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Recompute the whole rollup from the `booking` collection, e.g. to backfill existing bookings.
+
+        Bookings written while the rebuild is running may be missed, so run it while uploads are paused.
+
+        Returns:
+            int: Number of rollup documents written.
+        """
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {
+                        "package": "$package",
+                        "date": {
+                            "$dateToString": {
+                                "format": "%Y-%m-%d",
+                                "date": "$check_in_date",
+                            }
+                        },
+                    },
+                    "total_income": {"$sum": "$total_cost"},
+                }
+            }
+        ]
+        rollup = [
+            {
+                "package": row["_id"]["package"],
+                "date": row["_id"]["date"],
+                "total_income": row["total_income"],
+            }
+            for row in Booking.objects.aggregate(pipeline)
+            if row["_id"]["package"] is not None
+        ]
+        collection = cls._get_collection()
+        collection.delete_many({})
+        if rollup:
+            collection.insert_many(rollup, ordered=False)
+        DataVersion.bump("booking")
+        return len(rollup)
+
+
+@app.cli.command("rebuild-revenue")
+def rebuild_revenue() -> None:
+    """Rebuild the `DailyRevenue` rollup from all existing bookings."""
+    print(f"Rebuilt daily revenue rollup: {DailyRevenue.rebuild()} documents")
+
+
+def backfill_snapshots(
+    batch_size: int = 1000, on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """Set the snapshot fields (`hotel_name`, `customer_name`, `unit_cost` and `duration`) of existing bookings.
+
+    Bookings without a snapshot are read in batches of `batch_size` (by `_id`), the customers and packages
+    of a batch are loaded with one `$in` query each, and the batch is written with a single unordered bulk
+    write. Only bookings still missing a snapshot are read, so an interrupted backfill resumes where it
+    stopped when run again, and a completed backfill is a no-op.
+
+    Bookings whose customer or package no longer exists are left without a snapshot.
+
+    Args:
+        batch_size (int): Number of bookings read and updated per batch.
+        on_batch (Optional[Callable[[int], None]]): Called after each batch is written, with the
+            number of bookings updated, e.g. to report progress.
+
+    Returns:
+        int: Number of bookings updated.
+    """
+    collection = Booking._get_collection()
+    updated, after = 0, None
+    while True:
+        query = {"hotel_name": {"$exists": False}}
+        if after is not None:
+            # skip bookings of earlier batches that could not be backfilled
+            query["_id"] = {"$gt": after}
+        batch = list(
+            collection.find(query, {"customer": 1, "package": 1})
+            .sort("_id", 1)
+            .limit(max(1, batch_size))
+        )
+        if not batch:
+            break
+        after = batch[-1]["_id"]
+        customers = dict(
+            User.objects(id__in={row.get("customer") for row in batch}).scalar(
+                "id", "name"
+            )
+        )
+        packages = {
+            staycation.pk: staycation
+            for staycation in Staycation.objects(
+                id__in={row.get("package") for row in batch}
+            ).only("hotel_name", "unit_cost", "duration")
+        }
+        updates = [
+            UpdateOne(
+                {"_id": row["_id"]},
+                {
+                    "$set": {
+                        "customer_name": customers[row["customer"]],
+                        "hotel_name": packages[row["package"]].hotel_name,
+                        "unit_cost": packages[row["package"]].unit_cost,
+                        "duration": packages[row["package"]].duration,
+                    }
+                },
+            )
+            for row in batch
+            if row.get("customer") in customers and row.get("package") in packages
+        ]
+        if updates:
+            collection.bulk_write(updates, ordered=False)
+            updated += len(updates)
+        if on_batch is not None:
+            on_batch(len(updates))
+    if updated:
+        DataVersion.bump("booking")
+    return updated
+
+
+def rename_staycation(package: Staycation, hotel_name: str) -> int:
+    """Rename a staycation package, and the hotel name in the snapshot of its bookings.
+
+    The package is renamed first, so bookings made during the rename already take the new name,
+    and only bookings with another hotel name are updated. Running the rename again therefore
+    completes an interrupted rename.
+
+    Args:
+        package (Staycation): Staycation package to rename.
+        hotel_name (str): New name of the hotel.
+
+    Raises:
+        NotUniqueError: If another package already has the new name.
+
+    Returns:
+        int: Number of bookings updated.
+    """
+    package.update(set__hotel_name=hotel_name)
+    package.hotel_name = hotel_name
+    # invalidate the cached catalog, and the packages cached by hotel name
+    DataVersion.bump("staycation")
+    updated = Booking.objects(package=package, hotel_name__ne=hotel_name).update(
+        set__hotel_name=hotel_name
+    )
+    DataVersion.bump("booking")
+    return updated
+
+
+@app.cli.command("backfill-bookings")
+@click.option("--batch-size", default=1000, help="Bookings updated per batch.")
+def backfill_bookings(batch_size: int) -> None:
+    """Backfill the snapshot fields of existing bookings (resumable)."""
+    updated = backfill_snapshots(
+        batch_size, on_batch=lambda count: print(f"Updated {count} bookings")
+    )
+    print(f"Backfilled booking snapshots: {updated} bookings")
+
+
+@app.cli.command("rename-hotel")
+@click.argument("old_name")
+@click.argument("new_name")
+def rename_hotel(old_name: str, new_name: str) -> None:
+    """Rename a staycation package, keeping the snapshot of its bookings consistent."""
+    package = Staycation.objects(hotel_name=old_name).first()
+    if package is None:
+        raise click.ClickException(f"No Such Hotel: {old_name}")
+    print(
+        f"Renamed {old_name} to {new_name}: {rename_staycation(package, new_name)} bookings"
+    )
+
+
+def prefetch_packages(bookings: Iterable[Booking]) -> List[Booking]:
+    """Load the `Staycation` packages referenced by bookings with a single `$in` query.
+
+    Accessing `booking.package` otherwise dereferences the package with one query per booking.
+    The `package` of bookings whose package no longer exists is set to None.
+
+    Args:
+        bookings (Iterable[Booking]): Bookings, e.g. a page of a `Booking` queryset.
+
+    Returns:
+        List[Booking]: The bookings, with their `package` loaded (or None).
+    """
+    bookings = list(bookings)
+    # references of loaded documents are kept as `DBRef` until the field is accessed
+    references = [booking._data.get("package") for booking in bookings]
+    package_ids = {ref.id for ref in references if isinstance(ref, DBRef)}
+    if not package_ids:
+        return bookings
+    packages = {
+        staycation.pk: staycation
+        for staycation in Staycation.objects(id__in=package_ids)
+    }
+    for booking, ref in zip(bookings, references):
+        if isinstance(ref, DBRef):
+            booking._data["package"] = packages.get(ref.id)
+    return bookings
+
+
+def _history_cursor(booking: Booking) -> str:
+    """Cursor of the booking history page after `booking`, e.g. "2022-01-27T00:00:00_62a1...".
+
+    Args:
+        booking (Booking): Last booking of a page.
+
+    Returns:
+        str: Check-in date and id of the booking.
+    """
+    return f"{booking.check_in_date.isoformat()}_{booking.pk}"
+
+
+def booking_history(
+    customer: User, after: Optional[str], limit: int
+) -> Tuple[List[Booking], Optional[str]]:
+    """Retrieve a page of the bookings of a customer, latest check-in date first.
+
+    Pages are read with keyset pagination on (`check_in_date`, `_id`), using the index on
+    `customer`, `check_in_date` and `_id`, and their packages are loaded with `prefetch_packages()`,
+    so the cost of a page does not grow with the number of bookings of the customer.
+
+    Args:
+        customer (User): Customer of the bookings, e.g. the session user.
+        after (Optional[str]): Cursor of the page, from the previous page, None for the first page.
+        limit (int): Maximum number of bookings per page.
+
+    Raises:
+        ValueError: If `after` is not a valid cursor.
+
+    Returns:
+        Tuple[List[Booking], Optional[str]]: Bookings on the page, and the cursor of the next page (None if last page).
+    """
+    queryset = Booking.objects(customer=customer)
+    if after is not None:
+        check_in_date, _, booking_id = after.partition("_")
+        if not ObjectId.is_valid(booking_id):
+            raise ValueError(f"invalid cursor: {after}")
+        check_in_date = datetime.fromisoformat(check_in_date)
+        queryset = queryset.filter(
+            Q(check_in_date__lt=check_in_date)
+            | Q(check_in_date=check_in_date, id__lt=ObjectId(booking_id))
+        )
+    # fetch one extra booking, to know whether there is a next page
+    bookings = list(queryset.order_by("-check_in_date", "-id").limit(limit + 1))
+    next_after = _history_cursor(bookings[limit - 1]) if len(bookings) > limit else None
+    return prefetch_packages(bookings[:limit]), next_after
+
+
+def create_booking(
+    customer: User,
+    package: Staycation,
+    check_in_date: date,
+    idempotency_key: Optional[str] = None,
+) -> Tuple[Booking, bool]:
+    """Create a booking with a single insert, unless the same request was already made.
+
+    The customer and package are not re-fetched (the session user and the cached staycation are used
+    as references), and the total cost is computed in memory. If `idempotency_key` was already used by the
+    customer, the existing booking is returned without reserving a room. Otherwise, a room is reserved for
+    the check-in date (see `RoomInventory.reserve()`) before the booking is inserted. Should a concurrent
+    retry insert the same key first, the unique index on `Booking.idempotency_key` rejects the insert,
+    the room is released, and that booking is returned instead.
+
+    Args:
+        customer (User): User making the booking, e.g. the session user.
+        package (Staycation): Staycation package booked.
+        check_in_date (date): Check-in date of the booking.
+        idempotency_key (Optional[str]): Key identifying the booking request, e.g. from the booking form
+            or the `Idempotency-Key` header.
+
+    Raises:
+        SoldOutError: If the package has no rooms left on the check-in date.
+
+    Returns:
+        Tuple[Booking, bool]: The booking, and whether it was created by this call.
+    """
+    # keys are scoped to the customer, so different customers cannot collide
+    key = f"{customer.pk}:{idempotency_key}" if idempotency_key else None
+    if key:
+        # a retry is answered with the original booking, without taking (and releasing) a room
+        existing = Booking.objects(idempotency_key=key).first()
+        if existing is not None:
+            return existing, False
+    RoomInventory.reserve(package, check_in_date)
+    booking = Booking(
+        check_in_date=check_in_date,
+        customer=customer,
+        package=package,
+        idempotency_key=key,
+    )
+    # computing total cost for booking, and keeping a snapshot of the customer and package
+    booking.calculate_total_cost()
+    booking.take_snapshot()
+    try:
+        booking.save(force_insert=True)
+    except NotUniqueError:
+        # the request was already processed, return the original booking
+        RoomInventory.release(package, check_in_date)
+        return Booking.objects(idempotency_key=key).first(), False
+    except Exception:
+        RoomInventory.release(package, check_in_date)
+        raise
+    return booking, True
+
 
 @booking.route("/view_hotel=<hotel_name>", methods=["GET", "POST"])
+@login_required
 def book_hotel(hotel_name) -> Callable[[str, BookingForm, Staycation, str], str]:
     """Booking route endpoint.
 
@@ -73,26 +530,165 @@ def book_hotel(hotel_name) -> Callable[[str, BookingForm, Staycation, str], str]
     Returns:
         Callable[[str, BookingForm, Staycation, str], str]: HTML template for hotel booking.
     """
-    # retrieve the hotel data given hotel name for the template
-    data = Staycation.objects(hotel_name=hotel_name).first()
+    # retrieve the hotel data given hotel name for the template (and booking reference)
+    data = find_staycation(hotel_name)
     form = BookingForm()
     if request.method == "POST" and form.validate():
+        if data is None:
+            abort(404)
         # validate the date via `booking.BookingForm` and save booking to db
-        # preprocessing to get staycation and user references
-        user_ref = User.objects(email=current_user.email).first()
-        staycation_ref = Staycation.objects(hotel_name=hotel_name).first()
-        # create new staycation booking for hotel
-        booking = Booking(
-            check_in_date=form.date.data,
-            customer=user_ref,
-            package=staycation_ref,
-        )
-        # computing total cost for booking
-        booking.calculate_total_cost()
-        booking.save()
-        # logging to ensure booking is saved
-        app.logger.info(
-            f"Booking saved: {(booking.check_in_date, booking.customer, booking.package)}"
-        )
+        # the session user is already loaded, and used as the customer reference
+        try:
+            booking, created = create_booking(
+                current_user._get_current_object(),
+                data,
+                form.date.data,
+                form.idempotency_key.data,
+            )
+        except SoldOutError:
+            # no rooms left on the selected date
+            form.date.errors.append("Fully Booked!")
+        else:
+            # logging to ensure booking is saved
+            app.logger.info(
+                f"Booking {'saved' if created else 'already saved'}: "
+                f"{(booking.check_in_date, booking.customer, booking.package)}"
+            )
+            # new key for the re-rendered form, so a further booking is not mistaken for a retry
+            form.idempotency_key.data = uuid4().hex
     # return booking html page by default if GET request
     return render_template("booking.html", form=form, hotel=data, panel=hotel_name)
+
+
+@booking.route("/api/bookings", methods=["POST"])
+@login_required
+def api_create_booking() -> Tuple[Callable[[dict], dict], int]:
+    """Booking JSON route endpoint, using the same write path as `book_hotel`.
+
+    Expects a Json body of {"hotel_name": <hotel_name>, "check_in_date": "YYYY-MM-DD"}, and an optional
+    `Idempotency-Key` header, so retried requests return the original booking.
+
+    Args:
+        POST: /api/bookings
+
+    Returns:
+        Tuple[Callable[[dict], dict], int]: Json payload of the booking, with status 201 if created,
+            200 if it was already created by an earlier request with the same key, 400 if invalid,
+            or 409 if the package is fully booked on the check-in date.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        check_in_date = date.fromisoformat(payload["check_in_date"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "check_in_date (YYYY-MM-DD) is required"}), 400
+    package = find_staycation(payload.get("hotel_name"))
+    if package is None:
+        return jsonify({"error": "No Such Hotel!"}), 400
+    try:
+        booking, created = create_booking(
+            current_user._get_current_object(),
+            package,
+            check_in_date,
+            request.headers.get("Idempotency-Key"),
+        )
+    except SoldOutError:
+        return jsonify({"error": "Fully Booked!"}), 409
+    return (
+        jsonify(
+            {
+                "id": str(booking.pk),
+                "hotel_name": package.hotel_name,
+                "check_in_date": booking.check_in_date.strftime("%Y-%m-%d"),
+                "total_cost": booking.total_cost,
+            }
+        ),
+        201 if created else 200,
+    )
+
+
+@booking.route("/bookings")
+@login_required
+def render_bookings() -> Callable[[str, List[Booking], str, int, str], str]:
+    """Booking history ("My Bookings") route endpoint, for the session user.
+
+    Args:
+        GET: /bookings?after=<cursor>&limit=<limit>
+
+    Returns:
+        Callable[[str, List[Booking], str, int, str], str]: HTML template for a page of the booking history.
+    """
+    try:
+        bookings, next_after = booking_history(
+            current_user._get_current_object(), request.args.get("after"), page_size()
+        )
+    except ValueError:
+        abort(400)
+    return render_template(
+        "bookings.html",
+        bookings=bookings,
+        next_after=next_after,
+        limit=page_size(),
+        panel="My Bookings",
+    )
+
+
+@booking.route("/api/bookings", methods=["GET"])
+@login_required
+def list_bookings() -> Union[
+    Callable[[dict], dict], Tuple[Callable[[dict], dict], int]
+]:
+    """Booking history JSON route endpoint, for the session user.
+
+    Args:
+        GET: /api/bookings?after=<cursor>&limit=<limit>
+
+    Returns:
+        Union[Callable[[dict], dict], Tuple[Callable[[dict], dict], int]]: Json payload of a page of bookings
+            and the cursor of the next page, or status 400 if the cursor is invalid.
+    """
+    try:
+        bookings, next_after = booking_history(
+            current_user._get_current_object(), request.args.get("after"), page_size()
+        )
+    except ValueError:
+        return jsonify({"error": "invalid cursor"}), 400
+    return jsonify(
+        {
+            "bookings": [
+                {
+                    "id": str(booking.pk),
+                    "hotel_name": booking.hotel_name,
+                    "check_in_date": booking.check_in_date.strftime("%Y-%m-%d"),
+                    "duration": booking.duration,
+                    "unit_cost": booking.unit_cost,
+                    "total_cost": booking.total_cost,
+                    "image_url": booking.package.image_url if booking.package else None,
+                }
+                for booking in bookings
+            ],
+            "next": next_after,
+        }
+    )
+
+
+@booking.route("/api/availability/<hotel_name>")
+@login_required
+def availability(hotel_name: str) -> Callable[[dict], dict]:
+    """Availability route endpoint, listing the open check-in dates of a hotel for a month.
+
+    Args:
+        GET: /api/availability/<hotel_name>?month=YYYY-MM
+        hotel_name (str): Name of hotel.
+
+    Returns:
+        Callable[[dict], dict]: Json payload of rooms available by open date.
+    """
+    package = find_staycation(hotel_name)
+    if package is None:
+        abort(404)
+    try:
+        year, month = map(int, request.args.get("month", "").split("-"))
+        available = RoomInventory.availability(package, year, month)
+    except ValueError:
+        return jsonify({"error": "month (YYYY-MM) is required"}), 400
+    return jsonify({"hotel_name": hotel_name, "available": available})
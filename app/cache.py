@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from app import app, db
+
+
+class DataVersion(db.Document):
+    """Data version counter data model.
+
+    The `DataVersion` data model keeps a counter per data set (e.g. "booking"), which is bumped
+    with `$inc` every time the data set is written to. Results computed from a data set can then be
+    cached against its version, and are invalidated as soon as the version moves on.
+    All counter documents are stored in the database, under the collection `dataVersions`.
+
+    Versions read from the database are memoised in-process for `DATA_VERSION_TTL` seconds, so hot
+    paths do not query the database on every request. Writes made by this process are seen immediately,
+    while writes made by other processes are seen after at most `DATA_VERSION_TTL` seconds.
+
+    The required fields of the `DataVersion` document are:
+        1. `name`: The name of the data set, used as the document `_id`.
+        2. `version`: Number of writes to the data set so far.
+        3. `updated_at`: Time (UTC) of the latest write to the data set.
+    """
+
+    meta = {"collection": "dataVersions"}
+    name = db.StringField(primary_key=True)
+    version = db.IntField(default=0)
+    updated_at = db.DateTimeField()
+
+    # map of name -> (expiry time, version, updated_at), memoised in-process
+    _memo: Dict[str, Tuple[float, int, Optional[datetime]]] = {}
+
+    @classmethod
+    def bump(cls, name: str) -> None:
+        """Increase the version of a data set after it is written to.
+
+        Args:
+            name (str): Name of the data set, e.g. "booking".
+        """
+        # truncated to seconds, as HTTP dates (`Last-Modified`) have a resolution of one second
+        updated_at = datetime.utcnow().replace(microsecond=0)
+        document = cls._get_collection().find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": updated_at}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        cls._memo[name] = (
+            monotonic() + app.config["DATA_VERSION_TTL"],
+            document["version"],
+            updated_at,
+        )
+
+    @classmethod
+    def _read(cls, name: str) -> Tuple[int, Optional[datetime]]:
+        """Retrieve the version and time of the latest write of a data set, memoised in-process."""
+        memo = cls._memo.get(name)
+        if memo is None or memo[0] <= monotonic():
+            document = cls._get_collection().find_one({"_id": name}) or {}
+            memo = (
+                monotonic() + app.config["DATA_VERSION_TTL"],
+                document.get("version", 0),
+                document.get("updated_at"),
+            )
+            cls._memo[name] = memo
+        return memo[1], memo[2]
+
+    @classmethod
+    def current(cls, name: str) -> int:
+        """Retrieve the current version of a data set.
+
+        Args:
+            name (str): Name of the data set, e.g. "booking".
+
+        Returns:
+            int: Version of the data set, 0 if it has never been written to.
+        """
+        return cls._read(name)[0]
+
+    @classmethod
+    def last_modified(cls, name: str) -> Optional[datetime]:
+        """Retrieve the time of the latest write to a data set.
+
+        Args:
+            name (str): Name of the data set, e.g. "booking".
+
+        Returns:
+            Optional[datetime]: Time (UTC) of the latest write, None if it has never been written to.
+        """
+        return cls._read(name)[1]
+
+
+class ResultCache:
+    """Thread-safe, in-memory LRU cache of computed results with a time-to-live.
+
+    Entries are evicted when the cache holds more than `maxsize` entries (least recently used first),
+    or once they are older than `ttl` seconds. Callers should include the relevant `DataVersion`
+    in the cache key so writes invalidate results immediately.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # map of key -> (expiry time, value), ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retrieve the cached result for `key`, computing and caching it on a miss.
+
+        Args:
+            key (Hashable): Cache key, including the version of the data it is computed from.
+            compute (Callable[[], Any]): Function computing the result on a miss.
+
+        Returns:
+            Any: Cached or freshly computed result.
+        """
+        now = monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # compute outside of the lock, so slow computations do not block other keys
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Retrieve the cache counters, to size the cache.
+
+        Returns:
+            Dict[str, int]: Number of entries, maximum number of entries, hits and misses.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove the cached result for `key`, if any."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all cached results."""
+        with self._lock:
+            self._entries.clear()
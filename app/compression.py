@@ -0,0 +1,46 @@
+import gzip
+from typing import Optional
+
+from werkzeug.datastructures import Accept
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is used without it
+    brotli = None
+
+# responses smaller than this (in bytes) are not worth compressing
+MIN_SIZE = 512
+
+
+def negotiate(accept_encodings: Accept) -> Optional[str]:
+    """Pick the content coding to compress a response with, from those accepted by the client.
+
+    Args:
+        accept_encodings (Accept): Codings accepted by the client, e.g. `request.accept_encodings`.
+
+    Returns:
+        Optional[str]: "br" (if brotli is installed) or "gzip", None to send the response uncompressed.
+    """
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(content: bytes, encoding: str, level: int = 6) -> bytes:
+    """Compress `content` with a content coding.
+
+    Args:
+        content (bytes): Content to compress.
+        encoding (str): Either "br" or "gzip".
+        level (int): Compression level, from 1 to 9 for gzip or 0 to 11 for brotli. Lower levels
+            suit responses compressed per request, higher levels suit assets compressed once.
+
+    Returns:
+        bytes: Compressed content.
+    """
+    if encoding == "br":
+        return brotli.compress(content, quality=level)
+    # fixed mtime, so compressing the same content gives the same bytes
+    return gzip.compress(content, compresslevel=level, mtime=0)
@@ -1,4 +1,7 @@
-from typing import Callable, Dict, Union, Tuple, List
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Callable, Dict, Union, Tuple, List, Optional
 
 from flask import (
     Blueprint,
@@ -10,33 +13,33 @@ from flask import (
     url_for,
 )
 from flask_login import login_required
-
-from app import db
-from book import Booking
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import is_resource_modified
+
+from app import app
+from book import Booking, DailyRevenue
+from cache import DataVersion, ResultCache
+from compression import MIN_SIZE, compress, negotiate
+from pagination import keyset_page, page_size
 from staycation import Staycation
 from users import User
 
 # record all operations to execute when dashboard related operations are performed
 dashboard = Blueprint("dashboard", __name__)
+# chart payloads, keyed by the "booking" data version they were computed from
+chart_cache = ResultCache(
+    maxsize=app.config["CHART_CACHE_SIZE"], ttl=app.config["CHART_CACHE_TTL"]
+)
 
 
-class Chart(db.Document):
-    """Chart data model.
-
-    The `Chart` data model handles all chart objects generated based on current bookings.
-    All chart doucments created are stored in the database, under the collections `charts`.
-
-    The schema for the `Chart` data model is declared
-    based on storing key data required to generate a dashboard view
-    using ChartJS.
+class Chart:
+    """Trend chart of the total booking income for each hotel by date, built in memory and
+    rendered with ChartJS.
 
-    The required keys:
-        1. `dates`: An array of unique dates which have staycation package booked.
-        2. `start_date`: The earliest date where a staycation package is booked, as well as
-            the left end for the x-axis label.
-        3. `end_date`: The latest date where a staycation package is booked, as well as
-            the right end for the x-axis label.
-        4. `data`: Raw data of Hotel's booking income by date.
+    The chart keeps:
+        1. `dates`: An array of unique dates which have staycation package booked, in ascending order.
+            These are the x-axis labels.
+        2. `data`: Raw data of Hotel's booking income by date.
             E.g., {'Shangri-La Singapore': {'2022-01-27': 900.0,
                                             '2022-02-27': 1800.0,
                                             '2022-01-25': 900.0,
@@ -46,45 +49,20 @@ class Chart(db.Document):
                     ...}
     """
 
-    meta = {"collection": "charts"}
-    dates = db.ListField()
-    start_date = db.DateTimeField()
-    end_date = db.DateTimeField()
-    data = db.DictField()
-
-    def insert_data(self, data: Dict[str, Dict[str, float]]) -> None:
-        """Insert the total booking income for each hotel by date.
-
-        Update initial instantiated Chart object's fields from None to the values
-        retrieved from the total booking income data.
+    def __init__(self, data: Dict[str, Dict[str, float]]) -> None:
+        """Build a chart from the total booking income for each hotel by date.
 
         Args:
             data (Dict[str, Dict[str, float]]): Total booking income by hotels and dates.
         """
-        # we need to retrieve the start and end date of the chart
-        dates = set()
-        # obtaining the x-axis labels
-        # which is the unique dates in ascending order retrieve from all bookings
-        for _, values in data.items():
-            dates = dates.union(values.keys())
-        # date should also be sorted with the earliest date as the first element
-        dates = sorted(list(dates), reverse=False)
-        start_date, end_date = dates[0], dates[-1]
-
-        # we need to update the Chart object in DB
-        self.update(
-            __raw__={
-                "$set": {
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "dates": dates,
-                    "data": data,
-                }
-            },
-        )
+        self.dates = sorted(set().union(*(values.keys() for values in data.values())))
+        self.data = data
 
     def prepare_chart_dimension_and_label(
         self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        missing: Optional[float] = -1,
     ) -> Tuple[Dict[str, List[float]], List[str]]:
         """Prepare a dictionary of {Hotel1: [total_income1, total_income2, total_income3], Hotel2: [total_income1,...]...]}
         into the sub-chart for each hotel and x-axis labels in the form of an array of unique dates in ascending order
@@ -95,56 +73,50 @@ class Chart(db.Document):
         of the total booking income for each date, arranged in ascending order. If there is no booking income for a hotel for a date,
         we will insert a placeholder of "-1", which will be further process in javascript prior to charting.
 
+        Optionally, only the dates within [`start`, `end`] are materialised, so the chart payload only
+        covers the requested window.
+
+        Args:
+            start (Optional[str]): Earliest date ("YYYY-MM-DD") to include, defaults to the first date.
+            end (Optional[str]): Latest date ("YYYY-MM-DD") to include, defaults to the last date.
+            missing (Optional[float]): Placeholder for dates without booking income, "-1" or None (null).
+
         Returns:
             Tuple[Dict[str, List[float]], List[str]]: Tuple of chart dimensions and x-axis labels
                 ({hotel: [total_income1, total_income2, total_income3]}, x-axis labels).
         """
-        # given all the unique dates that occurred from the bookings
-        # we will need to ensure that each hotel has the same dimension of x_axis_labels
-        # this meant that for each date, each hotel should have a corresponding booking income data point
-        # if a hotel does not have a booking income for a date, we will insert a placeholder of "-1"
+        # `self.dates` is sorted in ascending order, so the window is located by binary search
+        lower = bisect_left(self.dates, start) if start else 0
+        upper = bisect_right(self.dates, end) if end else len(self.dates)
+        x_labels = self.dates[lower:upper]
+        # map each date to its position in x_labels once, instead of searching for it per hotel
+        column_by_date = {date: column for column, date in enumerate(x_labels)}
         chart_dimension = {}
-        for hotel in self.data:
-            # each hotel should have an array of total booking income for each date
-            # hence len(self.dates) is the dimension of the array
-            # default value is "-1" so that we only update if we have booking income
-            # on the specific day
-            chart_dimension[hotel] = [-1] * len(self.dates)
-            for date in self.dates:
-                # for each unique date in ascending order in x_axis_labels
-                # if the hotel has booking income on that date, we will insert the total income
-                # by finding the index of the date in x_axis_labels and update the corresponding index
-                # in the chart_dimension array for the hotel
-                if date in self.data[hotel]:
-                    chart_dimension[hotel][self.dates.index(date)] = self.data[hotel][
-                        date
-                    ]
-
-        return chart_dimension, self.dates
-
-
-class BarChart(db.Document):
-    """Bar Chart data model.
-
-    The `BarChart` data model handles all bar chart objects generated based on current bookings.
-    All bar chartt documents created are stored in the database, under the collections `barCharts`.
-
-    The schema for the `BarChart` data model is declared
-    based on storing key data required to generate a dashboard view
-    using ChartJS, for bar chart display due by user and hotel.
+        for hotel, income_by_date in self.data.items():
+            # each hotel has an array of total booking income for each date in the window
+            # default value is the placeholder, and only dates with booking income are filled in
+            row = [missing] * len(x_labels)
+            for date, total_income in income_by_date.items():
+                column = column_by_date.get(date)
+                if column is not None:
+                    row[column] = total_income
+            chart_dimension[hotel] = row
+
+        return chart_dimension, x_labels
+
+
+class BarChart:
+    """Bar chart of the number of bookings due by a user (by hotel) or a hotel (by user), built in
+    memory and rendered with ChartJS.
     """
 
-    meta = {"collection": "barCharts"}
-    data = db.DictField()
-    target = db.StringField()
+    def __init__(self, data: Dict[str, int]) -> None:
+        """Build a bar chart from the number of bookings by hotel or user.
 
-    def insert_data(self, data: Dict[str, Dict[str, float]], target: str) -> None:
-        """Insert computed dictionary of {<`User`/`Hotel`>: <`No. of Bookings`>}.
-        and the aggregation level of the data (user or hotel, with the specific user or hotel name).
+        Args:
+            data (Dict[str, int]): Dictionary of {<`User`/`Hotel`>: <`No. of Bookings`>}.
         """
-        self.update(
-            __raw__={"$set": {"data": data, "target": target}},
-        )
+        self.data = data
 
     def prepare_chart_dimension_and_label(
         self,
@@ -230,6 +202,405 @@ def _compute_booking_due_by(due_by: str, target: str) -> Dict[str, int]:
     return bookings_due_by
 
 
+def _aggregate_booking_due_by(due_by: str, target: str) -> Dict[str, int]:
+    """Compute dictionary of {<`User`/`Hotel`>: <`No. of Bookings`>}, within MongoDB.
+
+    Equivalent to `_compute_booking_due_by(due_by, target)`, but rather than scanning and dereferencing
+    every booking, only the bookings of the target are matched (using the `customer_name`/`hotel_name` index)
+    and counted by a `$group` stage, on the names kept in the booking snapshot.
+
+    Bookings without a snapshot (not backfilled yet) are counted by `_aggregate_unsnapshotted_due_by()`.
+
+    Args:
+        due_by (str): Due by `User` or `Hotel`, where if `User`, we will count the
+            number of bookings for different hotels. Else if `Hotel`, we will count the
+            number of bookings for different users.
+        target (str): Target `User` or `Hotel`, where we will by aggregate bookings by.
+
+    Returns:
+        Dict[str, int]: Total number of booking by either `User` or `Hotel`.
+    """
+    if due_by == "user":
+        # count bookings of the target user by hotel
+        match_field, group_field = "customer_name", "hotel_name"
+    else:
+        # count bookings of the target hotel by user
+        match_field, group_field = "hotel_name", "customer_name"
+    pipeline = [
+        {"$match": {match_field: target}},
+        {"$group": {"_id": f"${group_field}", "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ]
+    bookings_due_by = {
+        row["_id"]: row["count"] for row in Booking.objects.aggregate(pipeline)
+    }
+    unsnapshotted = _aggregate_unsnapshotted_due_by(due_by, target)
+    if unsnapshotted:
+        app.logger.warning(
+            f"{sum(unsnapshotted.values())} bookings of {due_by} {target!r} have no snapshot, "
+            "run `flask backfill-bookings` to count them from the snapshot"
+        )
+        for name, count in unsnapshotted.items():
+            bookings_due_by[name] = bookings_due_by.get(name, 0) + count
+        bookings_due_by = dict(sorted(bookings_due_by.items()))
+
+    return bookings_due_by
+
+
+def _aggregate_unsnapshotted_due_by(due_by: str, target: str) -> Dict[str, int]:
+    """Count the bookings without a snapshot (see `book.backfill_snapshots()`) due by a user or hotel.
+
+    Such bookings are matched by their `customer`/`package` reference (using its index) and counted
+    by a `$group` stage on the other reference, which is then resolved to names with a single query.
+    Once all bookings are backfilled, this only costs the lookup of the target and an empty match.
+
+    Args:
+        due_by (str): Due by `User` or `Hotel`.
+        target (str): Target `User` or `Hotel`, where we will by aggregate bookings by.
+
+    Returns:
+        Dict[str, int]: Number of bookings without a snapshot by either `User` or `Hotel`.
+    """
+    if due_by == "user":
+        match_field, group_field, group_model, name_field = (
+            "customer",
+            "package",
+            Staycation,
+            "hotel_name",
+        )
+        target_ids = list(User.objects(name=target).scalar("id"))
+    else:
+        match_field, group_field, group_model, name_field = (
+            "package",
+            "customer",
+            User,
+            "name",
+        )
+        target_ids = list(Staycation.objects(hotel_name=target).scalar("id"))
+    if not target_ids:
+        return {}
+    pipeline = [
+        {
+            "$match": {
+                match_field: {"$in": target_ids},
+                "hotel_name": {"$exists": False},
+            }
+        },
+        {"$group": {"_id": f"${group_field}", "count": {"$sum": 1}}},
+    ]
+    counts = {row["_id"]: row["count"] for row in Booking.objects.aggregate(pipeline)}
+    if not counts:
+        return {}
+    names = dict(group_model.objects(id__in=list(counts)).scalar("id", name_field))
+    bookings_due_by = {}
+    for reference, count in counts.items():
+        # bookings of deleted users or packages have no name to be counted by
+        if reference in names:
+            name = names[reference]
+            bookings_due_by[name] = bookings_due_by.get(name, 0) + count
+    return bookings_due_by
+
+
+def _bucket_label(day: str, granularity: str) -> str:
+    """Label of the bucket a date ("YYYY-MM-DD") falls in.
+
+    Args:
+        day (str): Date, formatted as "YYYY-MM-DD".
+        granularity (str): Either "day", "week" (labelled by its Monday, "YYYY-MM-DD") or "month" ("YYYY-MM").
+
+    Returns:
+        str: Bucket label, in the same (ascending) order as the dates.
+    """
+    if granularity == "month":
+        return day[:7]
+    if granularity == "week":
+        monday = date.fromisoformat(day)
+        return (monday - timedelta(days=monday.weekday())).isoformat()
+    return day
+
+
+def _bucket_income(
+    data: Dict[str, Dict[str, float]], granularity: str
+) -> Dict[str, Dict[str, float]]:
+    """Sum the total booking income for each hotel by date into weekly or monthly buckets.
+
+    Args:
+        data (Dict[str, Dict[str, float]]): Total booking income by hotels and dates.
+        granularity (str): Either "day", "week" or "month".
+
+    Returns:
+        Dict[str, Dict[str, float]]: Total booking income by hotels and bucket labels.
+    """
+    if granularity == "day":
+        return data
+    bucketed = {}
+    for hotel, income_by_date in data.items():
+        income_by_bucket = bucketed.setdefault(hotel, {})
+        for day, total_income in income_by_date.items():
+            bucket = _bucket_label(day, granularity)
+            income_by_bucket[bucket] = income_by_bucket.get(bucket, 0.0) + total_income
+    return bucketed
+
+
+def _lttb(points: List[Tuple[int, float]], threshold: int) -> List[Tuple[int, float]]:
+    """Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are kept, and the points in between are split into `threshold - 2`
+    buckets. From each bucket, the point forming the largest triangle with the previously kept point
+    and the average of the next bucket is kept, which preserves the peaks and troughs of the series.
+
+    Args:
+        points (List[Tuple[int, float]]): Points (x, y) of the series, in ascending order of x.
+        threshold (int): Maximum number of points to keep, at least 3.
+
+    Returns:
+        List[Tuple[int, float]]: Kept points, in ascending order of x.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return points
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    previous = points[0]
+    for i in range(threshold - 2):
+        # average of the next bucket (the last point, for the last bucket)
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_bucket = points[next_start:next_end] or points[-1:]
+        average_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        average_y = sum(y for _, y in next_bucket) / len(next_bucket)
+        # point of the current bucket forming the largest triangle
+        bucket = points[int(i * every) + 1 : next_start]
+        previous = max(
+            bucket,
+            key=lambda point: abs(
+                (previous[0] - average_x) * (point[1] - previous[1])
+                - (previous[0] - point[0]) * (average_y - previous[1])
+            ),
+        )
+        sampled.append(previous)
+    sampled.append(points[-1])
+    return sampled
+
+
+def _downsample_income(
+    data: Dict[str, Dict[str, float]], max_points: int
+) -> Dict[str, Dict[str, float]]:
+    """Downsample the booking income series of all hotels to at most `max_points` shared dates.
+
+    The dates are chosen once for the whole chart, by downsampling the total booking income of all
+    hotels (see `_lttb()`), and every hotel series is then projected onto those dates, so the chart
+    has at most `max_points` x-axis labels whatever the number of hotels.
+
+    Args:
+        data (Dict[str, Dict[str, float]]): Total booking income by hotels and dates (or bucket labels).
+        max_points (int): Maximum number of dates to keep.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Total booking income by hotels, for the dates kept.
+    """
+    # dates are positioned on the shared x-axis of the chart
+    dates = Chart(data).dates
+    column_by_date = {day: column for column, day in enumerate(dates)}
+    total_income_by_column = [0.0] * len(dates)
+    for income_by_date in data.values():
+        for day, total_income in income_by_date.items():
+            total_income_by_column[column_by_date[day]] += total_income
+    kept = {
+        dates[column]
+        for column, _ in _lttb(list(enumerate(total_income_by_column)), max_points)
+    }
+    return {
+        hotel: {
+            day: total_income
+            for day, total_income in income_by_date.items()
+            if day in kept
+        }
+        for hotel, income_by_date in data.items()
+    }
+
+
+def _trend_chart_payload(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    granularity: str = "day",
+    max_points: Optional[int] = None,
+) -> Dict[str, Union[Dict[str, List[float]], List[str]]]:
+    """Compute the `Total Income` chart dimensions and x-axis labels.
+
+    Args:
+        start (Optional[str]): Earliest date ("YYYY-MM-DD") to chart, defaults to the first booking date.
+        end (Optional[str]): Latest date ("YYYY-MM-DD") to chart, defaults to the last booking date.
+        granularity (str): Either "day", "week" or "month", to sum booking income by.
+        max_points (Optional[int]): Maximum number of dates (x-axis labels) to chart, None to keep all dates.
+
+    Returns:
+        Dict[str, Union[Dict[str, List[float]], List[str]]]: Payload of chart dimensions and x-axis labels.
+    """
+    # read daily booking income by hotels (within the window) from the incrementally maintained rollup
+    data = _bucket_income(DailyRevenue.income_by_hotel(start, end), granularity)
+    if max_points:
+        data = _downsample_income(data, max_points)
+    # process chart dimensions and x-axis labels
+    chart_dimension, x_labels = Chart(data).prepare_chart_dimension_and_label()
+    return {"chartDim": chart_dimension, "labels": x_labels}
+
+
+def _bar_chart_payload(due_by: str, target: str) -> Dict[str, List]:
+    """Compute the `Due by User` or `Due by Hotel` chart dimensions and x-axis labels.
+
+    Args:
+        due_by (str): Due by `User` or `Hotel`.
+        target (str): Target `User` or `Hotel`, where we will by aggregate bookings by.
+
+    Returns:
+        Dict[str, List]: Payload of chart dimensions and x-axis labels.
+    """
+    chart = BarChart(_aggregate_booking_due_by(due_by, target))
+    chart_dimension, x_labels = chart.prepare_chart_dimension_and_label()
+    return {"chartDim": chart_dimension, "labels": x_labels}
+
+
+def _trend_chart_options(
+    values: MultiDict,
+) -> Optional[Tuple[Optional[str], Optional[str], str, Optional[int]]]:
+    """Read the `Total Income` chart options from request form fields or query parameters.
+
+    Args:
+        values (MultiDict): `request.form` or `request.args`, with optional `start` and `end` ("YYYY-MM-DD"),
+            `granularity` ("day", "week" or "month") and `max_points` (x-axis labels).
+
+    Returns:
+        Optional[Tuple[Optional[str], Optional[str], str, Optional[int]]]: Arguments of `_trend_chart_payload`,
+            None if the granularity is invalid.
+    """
+    # optional date window ("YYYY-MM-DD") to chart, defaults to all booking dates
+    start, end = values.get("start") or None, values.get("end") or None
+    # booking income is summed by day, week or month
+    granularity = values.get("granularity", "day")
+    if granularity not in ("day", "week", "month"):
+        return None
+    # dates on the chart, defaults to `TREND_CHART_MAX_POINTS` in app config (0 keeps all points)
+    max_points = values.get(
+        "max_points", app.config["TREND_CHART_MAX_POINTS"], type=int
+    )
+    return start, end, granularity, max(3, max_points) if max_points else None
+
+
+def _sparse_trend_chart_payload(
+    payload: Dict[str, Union[Dict[str, List[float]], List[str]]]
+) -> Dict[str, Union[Dict[str, Dict[str, list]], List[str]]]:
+    """Convert the `Total Income` chart payload to a sparse (columnar) layout, without the `-1` padding.
+
+    Args:
+        payload (Dict[str, Union[Dict[str, List[float]], List[str]]]): Payload of chart dimensions and x-axis labels.
+
+    Returns:
+        Dict[str, Union[Dict[str, Dict[str, list]], List[str]]]: Payload of x-axis labels, and for each hotel,
+            the positions (`x`, in the x-axis labels) and total booking income (`y`) of dates with booking income.
+    """
+    series = {}
+    for hotel, row in payload["chartDim"].items():
+        columns = [
+            column for column, total_income in enumerate(row) if total_income != -1
+        ]
+        series[hotel] = {"x": columns, "y": [row[column] for column in columns]}
+    return {"labels": payload["labels"], "series": series}
+
+
+def _chart_response(key: tuple, compute: Callable[[], dict]) -> Response:
+    """Serve a chart payload as JSON, validated by the booking data version, and compressed.
+
+    The `ETag` and `Last-Modified` headers are derived from the "booking" data version, so repeat
+    requests are answered with `304 Not Modified` until a booking is written. Otherwise, the payload
+    is serialised and compressed once per data version, and served from `chart_cache`.
+
+    Args:
+        key (tuple): Chart and options, identifying the payload (e.g. ("due_by", "hotel", target)).
+        compute (Callable[[], dict]): Function computing the payload on a cache miss.
+
+    Returns:
+        Response: JSON response, or an empty `304 Not Modified` response.
+    """
+    version = DataVersion.current("booking")
+    # the URL identifies the chart and its options, so the data version is enough to validate it
+    etag = f"chart-{version}"
+    last_modified = DataVersion.last_modified("booking")
+    if not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    ):
+        response = Response(status=304)
+    else:
+        encoding = negotiate(request.accept_encodings)
+
+        def serialise() -> Tuple[bytes, Optional[str]]:
+            body = json.dumps(compute(), separators=(",", ":")).encode()
+            if encoding is None or len(body) < MIN_SIZE:
+                return body, None
+            return compress(body, encoding), encoding
+
+        body, content_encoding = chart_cache.get_or_compute(
+            (version, "response", *key, encoding), serialise
+        )
+        response = Response(body, mimetype="application/json")
+        if content_encoding is not None:
+            response.headers["Content-Encoding"] = content_encoding
+    # weak, as the same payload is sent with different content codings
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.vary.add("Accept-Encoding")
+    # charts must be revalidated on each view, which is cheap when they have not changed
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _name_page(
+    kind: str, prefix: Optional[str], after: Optional[str], limit: int
+) -> Tuple[List[str], Optional[str]]:
+    """Retrieve a page of user or hotel names for the dashboard selectors, in ascending order.
+
+    Only the name field is fetched, using the index on `User.name` or `Staycation.hotel_name`
+    for both the prefix match and the keyset pagination.
+
+    Args:
+        kind (str): Either "user" or "hotel".
+        prefix (Optional[str]): Prefix (case-sensitive) typed into the selector, matches all names if empty.
+        after (Optional[str]): Last name of the previous page, None for the first page.
+        limit (int): Maximum number of names per page.
+
+    Returns:
+        Tuple[List[str], Optional[str]]: Names on the page, and the cursor of the next page (None if last page).
+    """
+    model, field = (User, "name") if kind == "user" else (Staycation, "hotel_name")
+    queryset = model.objects.only(field)
+    if prefix:
+        queryset = queryset.filter(**{f"{field}__startswith": prefix})
+    if kind == "user":
+        # excluding Admin, as Admin does not make bookings
+        queryset = queryset.filter(name__ne="Admin")
+    documents, next_after = keyset_page(queryset, field, after, limit)
+    # users may share the same name, which is only listed once
+    return list(dict.fromkeys(document[field] for document in documents)), next_after
+
+
+@dashboard.route("/api/names/<any(user, hotel):kind>")
+@login_required
+def names(kind: str) -> Callable[[dict], dict]:
+    """Typeahead (user or hotel names) route endpoint, for the dashboard selectors.
+
+    Args:
+        GET: /api/names/<kind>?prefix=<prefix>&after=<after>&limit=<limit>
+        kind (str): Either "user" or "hotel".
+
+    Returns:
+        Callable[[dict], dict]: Json payload of names matching the prefix and the cursor of the next page.
+    """
+    page, next_after = _name_page(
+        kind, request.args.get("prefix"), request.args.get("after"), page_size()
+    )
+    return jsonify({"names": page, "next": next_after})
+
+
 @dashboard.route("/dashboard/trend_chart", methods=["GET", "POST"])
 def trend_chart() -> Union[Callable[[dict], dict], Callable[[str, str], str]]:
     """Dashboard (trend chart – `Total Income`) route endpoint.
@@ -238,31 +609,25 @@ def trend_chart() -> Union[Callable[[dict], dict], Callable[[str, str], str]]:
 
     Args:
         GET: /trend_chart
-        POST: /trend_chart
+        POST: /trend_chart, with optional form fields `start` and `end` ("YYYY-MM-DD"),
+            `granularity` ("day", "week" or "month") and `max_points` (x-axis labels).
 
     Returns:
         Union[Callable[[dict], dict], Callable[[str, str], str]]: Json payload of
             chart dimensions and x-axis labels or HTML template for `Total Income` on /dashboard.
     """
     if request.method == "POST":
-        # retrieve all relevant objects from database, in Bookings and Staycations
-        bookings = Booking.objects.all()
-
-        # compute daily booking income by hotels
-        daily_booking_income_by_hotel = _compute_daily_booking_income(bookings)
-        new_chart = Chart(dates=None, start_date=None, end_date=None, data=None).save()
-        # insert daily booking income by hotels into chart
-        new_chart.insert_data(daily_booking_income_by_hotel)
-        # retrieve the recent updated chart object from database
-        chart_object = Chart.objects(id=new_chart.id).first()
-        # process chart dimensions and x-axis labels
-        (
-            chart_dimension,
-            x_labels,
-        ) = chart_object.prepare_chart_dimension_and_label()
+        options = _trend_chart_options(request.form)
+        if options is None:
+            return jsonify({"error": "granularity must be day, week or month"}), 400
         # POST request the chart dimension and x-axis labels
         # via AJAX to generate chart on the canvas for the dashboard
-        return jsonify({"chartDim": chart_dimension, "labels": x_labels})
+        return jsonify(
+            chart_cache.get_or_compute(
+                (DataVersion.current("booking"), "trend_chart", *options),
+                lambda: _trend_chart_payload(*options),
+            )
+        )
     # return dashboard (trend_chart) page by default if GET request
     return render_template("trend_chart.html", panel="Dashboard")
 
@@ -281,11 +646,10 @@ def bar_chart_by_user() -> Union[Callable[[str, str], str], Callable[[dict], dic
         Union[Callable[[str, str], str], Callable[[dict], dict]]: Json payload of
             chart dimensions and x-axis labels or HTML template for `Due by User` on /dashboard.
     """
-    # retrieve all available user names, excluding Admin
-    user_names = [user.name for user in User.objects.all() if user.name != "Admin"]
-    # retrieve selected value from select tag on `Due By User`
-    target_user = request.form.get("username")
     if request.method == "GET":
+        # retrieve the first page of user names, excluding Admin
+        # further names are retrieved by typeahead from `/api/names/user`
+        user_names, _ = _name_page("user", None, None, app.config["PAGE_SIZE"])
         return render_template(
             "bar_chart.html",
             user_names=user_names,
@@ -293,27 +657,14 @@ def bar_chart_by_user() -> Union[Callable[[str, str], str], Callable[[dict], dic
             panel="Dashboard",
         )
     elif request.method == "POST":
-        # retrieve all bookings made by the target user
-        bookings_due_by_user = _compute_booking_due_by("user", target_user)
-        # generate BarChart object for plotting
-        new_chart = BarChart(data=None).save()
-        # insert daily booking income by hotels into chart
-        new_chart.insert_data(bookings_due_by_user, target_user)
-        # retrieve the recent updated chart object from database
-        chart_object = BarChart.objects(id=new_chart.id).first()
-        # process chart dimensions and x-axis labels
-        (
-            chart_dimension,
-            x_labels,
-        ) = chart_object.prepare_chart_dimension_and_label()
-        # POST data for charting with chart.js
-        return jsonify(
-            {
-                "chartDim": chart_dimension,
-                "labels": x_labels,
-                "user_name": target_user,
-            }
+        # retrieve selected value from select tag on `Due By User`
+        target_user = request.form.get("username")
+        payload = chart_cache.get_or_compute(
+            (DataVersion.current("booking"), "due_by", "user", target_user),
+            lambda: _bar_chart_payload("user", target_user),
         )
+        # POST data for charting with chart.js
+        return jsonify({**payload, "user_name": target_user})
 
 
 @dashboard.route("/dashboard/bar_chart_by_hotel", methods=["GET", "POST"])
@@ -330,11 +681,10 @@ def bar_chart_by_hotel() -> Union[Callable[[str, str], str], Callable[[dict], di
         Union[Callable[[str, str], str], Callable[[dict], dict]]: Json payload of
             chart dimensions and x-axis labels or HTML template for `Due by Hotel` on /dashboard
     """
-    # retrieve all available hotel names
-    hotel_names = [staycation.hotel_name for staycation in Staycation.objects.all()]
-    # retrieve selected value from select tag on `Due By Hotel`
-    target_hotel = request.form.get("hotelname")
     if request.method == "GET":
+        # retrieve the first page of hotel names
+        # further names are retrieved by typeahead from `/api/names/hotel`
+        hotel_names, _ = _name_page("hotel", None, None, app.config["PAGE_SIZE"])
         return render_template(
             "bar_chart.html",
             hotel_names=hotel_names,
@@ -342,27 +692,58 @@ def bar_chart_by_hotel() -> Union[Callable[[str, str], str], Callable[[dict], di
             panel="Dashboard",
         )
     elif request.method == "POST":
-        # retrieve all bookings made by the target hotel
-        bookings_due_by_hotel = _compute_booking_due_by("hotel", target_hotel)
-        # generate BarChart object for plotting
-        new_chart = BarChart(data=None).save()
-        # insert daily booking income by hotels into chart
-        new_chart.insert_data(bookings_due_by_hotel, target_hotel)
-        # retrieve the recent updated chart object from database
-        chart_object = BarChart.objects(id=new_chart.id).first()
-        # process chart dimensions and x-axis labels
-        (
-            chart_dimension,
-            x_labels,
-        ) = chart_object.prepare_chart_dimension_and_label()
+        # retrieve selected value from select tag on `Due By Hotel`
+        target_hotel = request.form.get("hotelname")
+        payload = chart_cache.get_or_compute(
+            (DataVersion.current("booking"), "due_by", "hotel", target_hotel),
+            lambda: _bar_chart_payload("hotel", target_hotel),
+        )
         # POST data for charting with chart.js
-        return jsonify(
-            {
-                "chartDim": chart_dimension,
-                "labels": x_labels,
-                "hotel_name": target_hotel,
-            }
+        return jsonify({**payload, "hotel_name": target_hotel})
+
+
+@dashboard.route("/api/charts/trend_chart")
+@login_required
+def trend_chart_data() -> Response:
+    """Dashboard (trend chart – `Total Income`) JSON route endpoint, for conditional GET requests.
+
+    Args:
+        GET: /api/charts/trend_chart?start=<start>&end=<end>&granularity=<granularity>&max_points=<max_points>&format=<format>
+            where `format` is "dense" (default, as for POST /dashboard/trend_chart) or "sparse".
+
+    Returns:
+        Response: Json payload of chart dimensions and x-axis labels, or an empty `304 Not Modified` response.
+    """
+    options = _trend_chart_options(request.args)
+    if options is None:
+        return jsonify({"error": "granularity must be day, week or month"}), 400
+    if request.args.get("format") == "sparse":
+        return _chart_response(
+            ("trend_chart", "sparse", *options),
+            lambda: _sparse_trend_chart_payload(_trend_chart_payload(*options)),
         )
+    return _chart_response(
+        ("trend_chart", "dense", *options), lambda: _trend_chart_payload(*options)
+    )
+
+
+@dashboard.route("/api/charts/due_by/<any(user, hotel):kind>")
+@login_required
+def bar_chart_data(kind: str) -> Response:
+    """Dashboard (bar chart – `Due by User` or `Due by Hotel`) JSON route endpoint, for conditional GET requests.
+
+    Args:
+        GET: /api/charts/due_by/<kind>?target=<user or hotel name>
+        kind (str): Due by "user" or "hotel".
+
+    Returns:
+        Response: Json payload of chart dimensions and x-axis labels, or an empty `304 Not Modified` response.
+    """
+    target = request.args.get("target")
+    return _chart_response(
+        ("due_by", kind, target),
+        lambda: {**_bar_chart_payload(kind, target), f"{kind}_name": target},
+    )
 
 
 @dashboard.route("/dashboard")
@@ -1,5 +1,7 @@
+from uuid import uuid4
+
 from flask_wtf import FlaskForm
-from wtforms import DateField, PasswordField, StringField
+from wtforms import DateField, HiddenField, PasswordField, StringField
 from wtforms.validators import DataRequired, Email, InputRequired, Length
 
 
@@ -50,3 +52,6 @@ class BookingForm(FlaskForm):
         format="%Y-%m-%d",
         validators=([DataRequired()]),
     )
+    # random key generated each time the form is rendered, so that submitting the same form
+    # twice (e.g. a double-click or a retry) only creates one booking
+    idempotency_key = HiddenField(default=lambda: uuid4().hex)
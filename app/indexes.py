@@ -0,0 +1,135 @@
+from typing import Dict, List, Tuple
+
+from app import app
+from book import Booking, DailyRevenue
+from cache import DataVersion
+from inventory import RoomInventory
+from staycation import Staycation
+from users import User
+
+# data models whose indexes are declared in their `meta`
+INDEXED_MODELS = [User, Staycation, Booking, DailyRevenue, DataVersion, RoomInventory]
+
+# hot queries of the application, as (description, data model, filter, sort)
+# filters use placeholder values, as only the query shape matters for the query plan
+HOT_QUERIES = [
+    ("User by email (login, register)", User, {"email": "admin@abc.com"}, None),
+    ("User by name (due by user)", User, {"name": "Admin"}, None),
+    ("Staycation by hotel_name (book_hotel)", Staycation, {"hotel_name": ""}, None),
+    (
+        "Staycation by price range, by price (search)",
+        Staycation,
+        {"unit_cost": {"$gte": 0, "$lte": 0}},
+        [("unit_cost", 1), ("hotel_name", 1)],
+    ),
+    (
+        "Staycation by duration and price range (search)",
+        Staycation,
+        {"duration": {"$gte": 0, "$lte": 0}, "unit_cost": {"$gte": 0, "$lte": 0}},
+        None,
+    ),
+    (
+        "Booking by customer, by check-in date",
+        Booking,
+        {"customer": None},
+        [("check_in_date", 1)],
+    ),
+    (
+        "Booking history of a customer (my bookings)",
+        Booking,
+        {"customer": None},
+        [("check_in_date", -1), ("_id", -1)],
+    ),
+    (
+        "Booking by package, by check-in date",
+        Booking,
+        {"package": None},
+        [("check_in_date", 1)],
+    ),
+    ("Booking by customer_name (due by user)", Booking, {"customer_name": ""}, None),
+    ("Booking by hotel_name (due by hotel)", Booking, {"hotel_name": ""}, None),
+]
+
+
+def _index_exists(spec: dict, indexes: List[dict]) -> bool:
+    """Check whether a declared index is among the indexes of a collection.
+
+    Args:
+        spec (dict): Index declared in the `meta` of a data model, as in `model._meta["index_specs"]`.
+        indexes (List[dict]): Indexes of the collection, as in `collection.index_information().values()`.
+
+    Returns:
+        bool: Whether the index exists.
+    """
+    fields = list(spec["fields"])
+    if any(list(index["key"]) == fields for index in indexes):
+        return True
+    # text indexes are keyed by `_fts`, with the indexed fields as weights
+    text_fields = {field for field, direction in fields if direction == "text"}
+    return bool(text_fields) and any(
+        ("_fts", "text") in list(index["key"])
+        and set(index.get("weights", {})) == text_fields
+        for index in indexes
+    )
+
+
+def ensure_indexes() -> Dict[str, List[str]]:
+    """Create the indexes declared in the `meta` of each data model, and verify they exist.
+
+    Creating an index that already exists is a no-op, so this is safe to run on every deployment.
+
+    Returns:
+        Dict[str, List[str]]: Declared indexes missing from each collection after creation,
+            empty if all indexes are in place.
+    """
+    missing = {}
+    for model in INDEXED_MODELS:
+        model.ensure_indexes()
+        collection = model._get_collection()
+        existing = list(collection.index_information().values())
+        missing[collection.name] = [
+            str(spec["fields"])
+            for spec in model._meta["index_specs"]
+            if not _index_exists(spec, existing)
+        ]
+    return missing
+
+
+def explain_hot_queries() -> List[Tuple[str, str]]:
+    """Retrieve the winning query plan of each hot query.
+
+    Returns:
+        List[Tuple[str, str]]: Description and winning plan of each query, e.g. "IXSCAN (email_1)"
+            or "COLLSCAN" for queries that are not served by an index.
+    """
+    plans = []
+    for description, model, query, sort in HOT_QUERIES:
+        cursor = model._get_collection().find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        # descend to the stage reading the collection (e.g. FETCH -> IXSCAN)
+        while "inputStage" in plan:
+            plan = plan["inputStage"]
+        stage = plan["stage"]
+        if "indexName" in plan:
+            stage = f"{stage} ({plan['indexName']})"
+        plans.append((description, stage))
+    return plans
+
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command() -> None:
+    """Create and verify the indexes of all data models."""
+    missing = ensure_indexes()
+    for collection, indexes in missing.items():
+        print(f"{collection}: {'missing ' + ', '.join(indexes) if indexes else 'ok'}")
+    if any(missing.values()):
+        raise SystemExit(1)
+
+
+@app.cli.command("explain-queries")
+def explain_queries_command() -> None:
+    """Report the query plans of the application's hot queries."""
+    for description, stage in explain_hot_queries():
+        print(f"{description:<45}{stage}")
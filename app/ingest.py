@@ -0,0 +1,309 @@
+import gzip
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from csv import DictReader
+from itertools import islice
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from pymongo.errors import BulkWriteError
+
+from book import Booking, DailyRevenue
+from cache import DataVersion
+from inventory import RoomInventory
+from passwords import hash_passwords
+from staycation import Staycation
+from users import User
+
+
+class IngestReport(NamedTuple):
+    """Summary of a bulk ingestion run, rendered on the upload page.
+
+    The fields of the `IngestReport` are:
+        1. `rows`: Number of CSV rows read from the uploaded file.
+        2. `inserted`: Number of documents written to the database.
+        3. `skipped`: Number of rows dropped (duplicates, unresolved references or fully booked dates).
+        4. `seconds`: Wall-clock time taken for the whole ingestion.
+    """
+
+    rows: int
+    inserted: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput of the ingestion run, in CSV rows processed per second."""
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def read_csv_rows(path: str) -> Iterator[dict]:
+    """Stream the rows of a (optionally gzip-compressed) CSV file.
+
+    The file is decoded incrementally and rows are yielded one at a time, so memory usage does not
+    depend on the size of the file. Gzip-compressed files (e.g. `.csv.gz`) are detected by their
+    magic number and decompressed on the fly.
+
+    Args:
+        path (str): Location of the CSV file.
+
+    Yields:
+        Iterator[dict]: CSV rows, with fields as keys in dictionary.
+    """
+    with open(path, "rb") as raw_file:
+        compressed = raw_file.read(2) == b"\x1f\x8b"
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", newline="", encoding="utf-8") as csv_file:
+        yield from DictReader(csv_file, delimiter=",", quotechar='"')
+
+
+def _chunked(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Split an iterable of CSV rows into lists of at most `size` rows.
+
+    Args:
+        rows (Iterable[dict]): CSV rows, with fields as keys in dictionary.
+        size (int): Maximum number of rows per chunk.
+
+    Yields:
+        Iterator[List[dict]]: Chunks of CSV rows, in file order.
+    """
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# passwords per worker below which a chunk is hashed serially, at ~30µs per hash
+MIN_HASHES_PER_WORKER = 128
+
+
+class BulkIngestor:
+    """Chunked bulk loader for CSV uploads of "staycation", "booking" and "users" files.
+
+    Rather than saving one document per row (and, for bookings, looking up the `User` and
+    `Staycation` references per row), rows are processed in chunks of `batch_size`:
+        1. References (customer email, hotel name) required by a chunk are resolved with a single
+            `$in` query and kept in in-memory maps, so each key is only looked up once per upload.
+        2. Documents are built and validated in memory. For users, passwords of large chunks are
+            hashed in parallel across a pool of `hash_workers` processes, as hashing is CPU-bound.
+            The pool is started on first use, and shut down at the end of the upload.
+        3. For bookings, rooms are reserved once per package and check-in date of a chunk
+            (see `RoomInventory.reserve_many()`), dropping bookings of fully booked dates.
+        4. Each chunk is written with a single unordered `insert_many`, and for bookings,
+            the `DailyRevenue` rollup is updated with a single bulk write.
+    """
+
+    def __init__(
+        self, file_type: str, batch_size: int = 1000, hash_workers: int = 1
+    ) -> None:
+        self.file_type = file_type
+        self.batch_size = max(1, batch_size)
+        self.hash_workers = max(1, hash_workers)
+        # lookup maps of email -> `User` and hotel name -> `Staycation`, shared across chunks
+        # emails of users created by the upload map to None, as they are only used for deduplication
+        self._users: Dict[str, Optional[User]] = {}
+        self._staycations: Dict[str, Staycation] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def ingest(
+        self,
+        rows: Iterable[dict],
+        on_chunk: Optional[Callable[[int, int], None]] = None,
+    ) -> IngestReport:
+        """Ingest all rows into the collection matching `file_type`.
+
+        Args:
+            rows (Iterable[dict]): CSV rows, with fields as keys in dictionary.
+            on_chunk (Optional[Callable[[int, int], None]]): Called after each chunk is written, with the
+                number of rows in the chunk and the number of documents inserted, e.g. to report progress.
+
+        Returns:
+            IngestReport: Number of rows read, inserted and skipped, and time taken.
+        """
+        start = perf_counter()
+        total = inserted = 0
+        try:
+            for chunk in _chunked(rows, self.batch_size):
+                total += len(chunk)
+                documents = self._build_documents(chunk)
+                chunk_inserted = self._insert(documents)
+                inserted += chunk_inserted
+                if self.file_type == "booking":
+                    # `insert_many` bypasses `Booking.save()`, so update the revenue rollup here
+                    DailyRevenue.record(documents)
+                    DataVersion.bump("booking")
+                elif self.file_type == "staycation":
+                    # invalidate the cached catalog on /products
+                    DataVersion.bump("staycation")
+                if on_chunk is not None:
+                    on_chunk(len(chunk), chunk_inserted)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        return IngestReport(total, inserted, total - inserted, perf_counter() - start)
+
+    def _build_documents(self, chunk: List[dict]) -> list:
+        """Build the documents for a chunk of rows, based on `file_type`."""
+        if self.file_type == "staycation":
+            return [Staycation(**item) for item in chunk]
+        elif self.file_type == "booking":
+            return self._build_bookings(chunk)
+        return self._build_users(chunk)
+
+    def _build_bookings(self, chunk: List[dict]) -> List[Booking]:
+        """Build `Booking` documents for a chunk, resolving references via the lookup maps.
+
+        Rows referencing an unknown customer email or hotel name, or a fully booked date, are skipped.
+        """
+        self._resolve(
+            self._users,
+            User,
+            "email",
+            {item["customer"] for item in chunk},
+            # `name` is kept in the snapshot of the booking
+            ["email", "name"],
+        )
+        self._resolve(
+            self._staycations,
+            Staycation,
+            "hotel_name",
+            {item["hotel_name"] for item in chunk},
+            # `unit_cost` and `duration` are required to compute the total cost of booking,
+            # and `rooms` to reserve rooms
+            ["hotel_name", "unit_cost", "duration", "rooms"],
+        )
+        bookings = []
+        for item in chunk:
+            user_ref = self._users.get(item["customer"])
+            staycation_ref = self._staycations.get(item["hotel_name"])
+            if user_ref is None or staycation_ref is None:
+                continue
+            booking = Booking(
+                check_in_date=item["check_in_date"],
+                customer=user_ref,
+                package=staycation_ref,
+            )
+            booking.calculate_total_cost()
+            booking.take_snapshot()
+            bookings.append(booking)
+        return self._reserve_rooms(bookings)
+
+    @staticmethod
+    def _reserve_rooms(bookings: List[Booking]) -> List[Booking]:
+        """Reserve rooms for a chunk of bookings, with one reservation per package and check-in date.
+
+        Bookings beyond the rooms left on their check-in date are dropped (and reported as skipped),
+        so uploads cannot oversell a hotel either.
+        """
+        by_package_and_date = defaultdict(list)
+        for booking in bookings:
+            # `check_in_date` is still a raw string for bookings built from CSV rows
+            check_in_date = Booking.check_in_date.to_mongo(booking.check_in_date).date()
+            by_package_and_date[booking.package.pk, check_in_date].append(booking)
+        reserved = []
+        for (_, check_in_date), group in by_package_and_date.items():
+            rooms = RoomInventory.reserve_many(
+                group[0].package, check_in_date, len(group)
+            )
+            reserved += group[:rooms]
+        return reserved
+
+    def _build_users(self, chunk: List[dict]) -> List[User]:
+        """Build `User` documents for a chunk, skipping emails that are already registered
+        (checked with a single `$in` query) or repeated within the upload.
+
+        Passwords of the new users are hashed with `_hash()`.
+        """
+        self._resolve(
+            self._users, User, "email", {item["email"] for item in chunk}, ["email"]
+        )
+        new_users = []
+        for item in chunk:
+            if item["email"] in self._users:
+                continue
+            # track the new email so later duplicates within the upload are skipped
+            self._users[item["email"]] = None
+            new_users.append(item)
+        passwords = [item["password"] for item in new_users]
+        return [
+            User(email=item["email"], password=hashpass, name=item["name"])
+            for item, hashpass in zip(new_users, self._hash(passwords))
+        ]
+
+    def _hash(self, passwords: List[str]) -> List[str]:
+        """Hash the passwords of a chunk, in the process pool if the chunk is large enough.
+
+        A hash takes tens of microseconds, so small chunks are hashed serially: the IPC round trip
+        to the workers would cost more than it saves. Otherwise, passwords are split into one slice
+        per worker, so each worker pays IPC once per chunk.
+        """
+        if (
+            self.hash_workers == 1
+            or len(passwords) < self.hash_workers * MIN_HASHES_PER_WORKER
+        ):
+            return hash_passwords(passwords)
+        if self._executor is None:
+            # "spawn" rather than the default "fork" on Linux: this runs in an upload thread, and
+            # forking a process holding the MongoDB client and other threads' locks is unsafe.
+            # Workers only import `passwords`, so they start without the Flask app.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.hash_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        size = -(-len(passwords) // self.hash_workers)
+        slices = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+        return [
+            hashpass
+            for hashes in self._executor.map(hash_passwords, slices)
+            for hashpass in hashes
+        ]
+
+    @staticmethod
+    def _resolve(
+        lookup: dict, model: type, field: str, keys: set, only: List[str]
+    ) -> None:
+        """Load documents for `keys` missing from `lookup` with a single `$in` query.
+
+        Args:
+            lookup (dict): Map of `field` value -> document, updated in place.
+            model (type): Data model to query, either `User` or `Staycation`.
+            field (str): Field to look up documents by.
+            keys (set): Values of `field` required by the current chunk.
+            only (List[str]): Fields to load for each document.
+        """
+        missing = [key for key in keys if key not in lookup]
+        if not missing:
+            return
+        for document in model.objects(**{f"{field}__in": missing}).only(*only):
+            # keep the first document found for a key, as with `.first()`
+            lookup.setdefault(document[field], document)
+
+    @staticmethod
+    def _insert(documents: list) -> int:
+        """Validate and write a chunk of documents with a single `insert_many`.
+
+        Documents violating a unique index (e.g. a `Staycation` uploaded twice) are skipped,
+        while the rest of the chunk is still written.
+
+        Args:
+            documents (list): Documents of the same data model.
+
+        Returns:
+            int: Number of documents written.
+        """
+        if not documents:
+            return 0
+        for document in documents:
+            document.validate()
+        collection = type(documents[0])._get_collection()
+        try:
+            result = collection.insert_many(
+                [document.to_mongo() for document in documents], ordered=False
+            )
+        except BulkWriteError as error:
+            return error.details["nInserted"]
+        return len(result.inserted_ids)
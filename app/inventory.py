@@ -0,0 +1,215 @@
+import calendar
+from datetime import date, datetime, time, timedelta
+from typing import Dict
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app import app, db
+from staycation import Staycation
+
+
+class SoldOutError(Exception):
+    """Raised when a staycation package has no rooms left on the requested date."""
+
+
+class RoomInventory(db.Document):
+    """Room inventory data model.
+
+    The `RoomInventory` data model keeps the number of rooms still available for a staycation package
+    on a check-in date, so bookings cannot oversell a hotel. Documents are only created once a date
+    is first booked, with the `Staycation.rooms` not taken by bookings already stored for the date.
+    All inventory documents are stored in the database, under the collection `roomInventory`.
+
+    Rooms are reserved with a single conditional `$inc` (find-and-modify on `available > 0`), which
+    MongoDB applies atomically, so concurrent bookings never oversell and never need a lock.
+
+    The required fields of the `RoomInventory` document are:
+        1. `package`: The `Staycation` object.
+        2. `date`: The check-in date, formatted as "YYYY-MM-DD".
+        3. `available`: Number of rooms still available on the date.
+    """
+
+    # one inventory document per (package, date), also serving the monthly availability range read
+    meta = {
+        "collection": "roomInventory",
+        "indexes": [{"fields": ["package", "date"], "unique": True}],
+    }
+    package = db.ReferenceField(Staycation)
+    date = db.StringField(required=True)
+    available = db.IntField(min_value=0)
+
+    @staticmethod
+    def _booked(package: Staycation, start: date, end: date) -> Dict[str, int]:
+        """Count the bookings already stored for a staycation package, by check-in date.
+
+        Bookings may predate the inventory (e.g. historical data or CSV uploads), so they are counted
+        when the inventory of a date is first created.
+
+        Args:
+            package (Staycation): Staycation package.
+            start (date): First check-in date to count.
+            end (date): Last check-in date to count.
+
+        Returns:
+            Dict[str, int]: Number of bookings by check-in date ("YYYY-MM-DD"), for dates with bookings.
+        """
+        # imported here, as `book` imports this module
+        from book import Booking
+
+        pipeline = [
+            {
+                "$match": {
+                    "package": package.pk,
+                    "check_in_date": {
+                        "$gte": datetime.combine(start, time.min),
+                        "$lt": datetime.combine(end + timedelta(days=1), time.min),
+                    },
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "$dateToString": {
+                            "format": "%Y-%m-%d",
+                            "date": "$check_in_date",
+                        }
+                    },
+                    "count": {"$sum": 1},
+                }
+            },
+        ]
+        return {row["_id"]: row["count"] for row in Booking.objects.aggregate(pipeline)}
+
+    @classmethod
+    def _initialise(cls, package: Staycation, check_in_date: date) -> None:
+        """Create the inventory document of a date, with the rooms not taken by existing bookings.
+
+        Args:
+            package (Staycation): Staycation package.
+            check_in_date (date): Check-in date.
+        """
+        rooms = package.rooms or app.config["DEFAULT_ROOMS"]
+        booked = cls._booked(package, check_in_date, check_in_date)
+        try:
+            cls._get_collection().insert_one(
+                {
+                    "package": package.pk,
+                    "date": check_in_date.strftime("%Y-%m-%d"),
+                    "available": max(0, rooms - sum(booked.values())),
+                }
+            )
+        except DuplicateKeyError:
+            # created concurrently by another request
+            pass
+
+    @classmethod
+    def reserve(cls, package: Staycation, check_in_date: date) -> int:
+        """Reserve a room of a staycation package on a check-in date.
+
+        Args:
+            package (Staycation): Staycation package booked.
+            check_in_date (date): Check-in date of the booking.
+
+        Raises:
+            SoldOutError: If no rooms are left on the date.
+
+        Returns:
+            int: Number of rooms still available on the date, after the reservation.
+        """
+        collection = cls._get_collection()
+        key = {"package": package.pk, "date": check_in_date.strftime("%Y-%m-%d")}
+        # retried once, after creating the inventory document of a date not booked before
+        for _ in range(2):
+            inventory = collection.find_one_and_update(
+                {**key, "available": {"$gt": 0}},
+                {"$inc": {"available": -1}},
+                projection={"available": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if inventory is not None:
+                return inventory["available"]
+            # either the date is sold out, or it has not been booked before
+            if collection.count_documents(key, limit=1):
+                break
+            cls._initialise(package, check_in_date)
+        raise SoldOutError(f"{package.hotel_name} is fully booked")
+
+    @classmethod
+    def reserve_many(cls, package: Staycation, check_in_date: date, count: int) -> int:
+        """Reserve up to `count` rooms of a staycation package on a check-in date, e.g. for uploaded bookings.
+
+        Rooms are taken with a conditional `$inc` on the number of rooms read, retried if another
+        request reserved rooms in between, so concurrent reservations never oversell.
+
+        Args:
+            package (Staycation): Staycation package booked.
+            check_in_date (date): Check-in date of the bookings.
+            count (int): Number of rooms to reserve.
+
+        Returns:
+            int: Number of rooms reserved, less than `count` if the date sold out.
+        """
+        collection = cls._get_collection()
+        key = {"package": package.pk, "date": check_in_date.strftime("%Y-%m-%d")}
+        while True:
+            inventory = collection.find_one(key, {"available": 1})
+            if inventory is None:
+                cls._initialise(package, check_in_date)
+                continue
+            reserved = min(count, inventory["available"])
+            if reserved <= 0:
+                return 0
+            result = collection.update_one(
+                {**key, "available": inventory["available"]},
+                {"$inc": {"available": -reserved}},
+            )
+            if result.modified_count:
+                return reserved
+
+    @classmethod
+    def release(cls, package: Staycation, check_in_date: date) -> None:
+        """Release a room reserved with `reserve()`, e.g. if the booking could not be saved.
+
+        Args:
+            package (Staycation): Staycation package booked.
+            check_in_date (date): Check-in date of the booking.
+        """
+        cls._get_collection().update_one(
+            {"package": package.pk, "date": check_in_date.strftime("%Y-%m-%d")},
+            {"$inc": {"available": 1}},
+        )
+
+    @classmethod
+    def availability(cls, package: Staycation, year: int, month: int) -> Dict[str, int]:
+        """Retrieve the number of rooms available on each open date of a month, with a single indexed read
+        (and a count of existing bookings, for dates without inventory).
+
+        Args:
+            package (Staycation): Staycation package.
+            year (int): Year, e.g. 2022.
+            month (int): Month, from 1 to 12.
+
+        Returns:
+            Dict[str, int]: Rooms available by date ("YYYY-MM-DD"), for dates with at least one room.
+        """
+        days = calendar.monthrange(year, month)[1]
+        dates = [f"{year:04d}-{month:02d}-{day:02d}" for day in range(1, days + 1)]
+        inventories = {
+            inventory["date"]: inventory["available"]
+            for inventory in cls._get_collection().find(
+                {"package": package.pk, "date": {"$gte": dates[0], "$lte": dates[-1]}},
+                {"_id": 0, "date": 1, "available": 1},
+            )
+        }
+        # dates without an inventory document have not been booked through the inventory yet,
+        # so their rooms are only taken by existing bookings
+        rooms = package.rooms or app.config["DEFAULT_ROOMS"]
+        booked = {}
+        if len(inventories) < len(dates):
+            booked = cls._booked(package, date(year, month, 1), date(year, month, days))
+        available = {
+            day: inventories[day] if day in inventories else rooms - booked.get(day, 0)
+            for day in dates
+        }
+        return {day: count for day, count in available.items() if count > 0}
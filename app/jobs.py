@@ -0,0 +1,224 @@
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+import click
+from werkzeug.datastructures import FileStorage
+
+from app import app, db
+from ingest import BulkIngestor, read_csv_rows
+from metrics import track
+from users import user_cache
+
+# uploads are processed in the background, so large files do not hold up (or time out) web requests
+upload_executor = ThreadPoolExecutor(
+    max_workers=app.config["UPLOAD_WORKERS"], thread_name_prefix="upload"
+)
+
+
+class UploadJob(db.Document):
+    """Upload job data model.
+
+    The `UploadJob` data model tracks the progress of a CSV file uploaded on /upload, which is spooled
+    to disk and processed in the background by `upload_executor`. As jobs are stored in the database,
+    under the collection `uploadJobs`, their status can be retrieved from any web worker.
+
+    Jobs are processed by the web worker that queued them, so a job is lost if that worker exits
+    (e.g. gunicorn restarts workers after `max_requests`). Such jobs are marked as failed, and their
+    spooled files removed, by `fail_interrupted_jobs()` when a worker starts.
+
+    The required fields of the `UploadJob` document are:
+        1. `file_type`: Type of file uploaded, either "staycation", "booking" or "users".
+        2. `filename`: Name of the file uploaded.
+        3. `path`: Location of the spooled file, removed once the job is finished.
+        4. `batch_size`: Number of rows written to the database per bulk insert.
+        5. `status`: Either "queued", "running", "done" or "failed".
+        6. `rows_done`: Number of rows processed so far.
+        7. `rows_failed`: Number of rows processed but not inserted (duplicates or unresolved references).
+        8. `created_at`, `started_at`, `finished_at`: Time of upload, and start and end of processing.
+        9. `error`: Error message, if the job failed.
+        10. `worker`: Host and process id ("host:pid") of the web worker processing the job.
+    """
+
+    meta = {"collection": "uploadJobs", "indexes": ["-created_at", "status"]}
+    file_type = db.StringField(required=True)
+    filename = db.StringField()
+    path = db.StringField()
+    batch_size = db.IntField()
+    status = db.StringField(default="queued")
+    rows_done = db.IntField(default=0)
+    rows_failed = db.IntField(default=0)
+    created_at = db.DateTimeField(default=datetime.utcnow)
+    started_at = db.DateTimeField()
+    finished_at = db.DateTimeField()
+    error = db.StringField()
+    worker = db.StringField()
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        """Throughput of the job so far, in CSV rows processed per second."""
+        if self.started_at is None:
+            return None
+        seconds = (
+            (self.finished_at or datetime.utcnow()) - self.started_at
+        ).total_seconds()
+        return self.rows_done / seconds if seconds else float(self.rows_done)
+
+    def to_status(self) -> dict:
+        """Status of the job, as returned by the job status endpoint."""
+        return {
+            "id": str(self.id),
+            "file_type": self.file_type,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "rows_failed": self.rows_failed,
+            "rows_per_second": self.rows_per_second,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+def submit_upload(file: FileStorage, file_type: str, batch_size: int) -> UploadJob:
+    """Spool an uploaded CSV file to disk, and queue it for processing in the background.
+
+    The multipart stream is parsed incrementally (large parts are buffered to a temporary file),
+    and copied to the spool directory in chunks, so the upload is never held in memory.
+
+    Args:
+        file (FileStorage): CSV file uploaded, optionally gzip-compressed (`.csv.gz`).
+        file_type (str): Type of file uploaded, either "staycation", "booking" or "users".
+        batch_size (int): Number of rows to write to the database per bulk insert.
+
+    Returns:
+        UploadJob: Queued job, to track the progress of the upload.
+    """
+    spool_dir = app.config["UPLOAD_SPOOL_DIR"]
+    os.makedirs(spool_dir, exist_ok=True)
+    # compression is detected from the file content, so the spooled file keeps no extension
+    path = os.path.join(spool_dir, uuid4().hex)
+    # `save()` copies the upload to disk in chunks, rather than reading it into memory
+    file.save(path)
+    job = UploadJob(
+        file_type=file_type,
+        filename=file.filename,
+        path=path,
+        batch_size=batch_size,
+        worker=_worker_id(),
+    ).save()
+    upload_executor.submit(process_upload, job.id)
+    return job
+
+
+def process_upload(job_id) -> None:
+    """Process a spooled CSV file in chunks, recording progress on its `UploadJob`.
+
+    Performs file processing logic to generate appropriate data model objects in either,
+    ["Staycation", "Booking", "User"], using `ingest.BulkIngestor`.
+
+    Args:
+        job_id (ObjectId): _id of the `UploadJob` to process.
+    """
+    job = UploadJob.objects(id=job_id).first()
+    job.update(set__status="running", set__started_at=datetime.utcnow())
+
+    def record_progress(rows: int, inserted: int) -> None:
+        # atomic increments, so progress can be read while the job is running
+        job.update(inc__rows_done=rows, inc__rows_failed=rows - inserted)
+
+    try:
+        # rows are streamed from the spooled file, and handed to the ingestor in chunks
+        with track(f"upload_job.{job.file_type}") as queries:
+            report = BulkIngestor(
+                job.file_type,
+                job.batch_size,
+                hash_workers=app.config["UPLOAD_HASH_WORKERS"],
+            ).ingest(read_csv_rows(job.path), on_chunk=record_progress)
+        job.update(set__status="done", set__finished_at=datetime.utcnow())
+        app.logger.info(
+            f"Uploaded {job.file_type}: {report.rows} rows ({report.rows_per_second:.1f} rows/s, "
+            f"{queries.commands} MongoDB commands)"
+        )
+    except Exception as error:
+        job.update(
+            set__status="failed",
+            set__finished_at=datetime.utcnow(),
+            set__error=str(error),
+        )
+        app.logger.exception(f"Upload job {job_id} failed")
+    finally:
+        if job.file_type == "users":
+            # drop cached users, so sessions pick up the uploaded user records
+            user_cache.clear()
+        os.remove(job.path)
+
+
+def _worker_id() -> str:
+    """Host and process id of the current process, as "host:pid"."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _is_running(worker: str) -> bool:
+    """Whether the process of a worker id ("host:pid") on the current host is still running."""
+    try:
+        # signal 0 only checks that the process exists
+        os.kill(int(worker.rpartition(":")[2]), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fail_interrupted_jobs(all_workers: bool = False) -> int:
+    """Mark the unfinished jobs of exited web workers of this host as failed, and remove their spooled files.
+
+    Jobs queued on other hosts are left alone, as their workers (and spooled files) cannot be checked from here.
+
+    Args:
+        all_workers (bool): Fail the unfinished jobs of all workers of this host (and jobs without a
+            worker), e.g. when the app starts and no worker is running yet.
+
+    Returns:
+        int: Number of jobs marked as failed.
+    """
+    host = socket.gethostname()
+    failed = 0
+    for job in UploadJob.objects(status__in=["queued", "running"]).only(
+        "worker", "path"
+    ):
+        if job.worker is None:
+            interrupted = all_workers
+        elif job.worker.rpartition(":")[0] != host:
+            interrupted = False
+        else:
+            interrupted = all_workers or not _is_running(job.worker)
+        if not interrupted:
+            continue
+        # only fail the job if it did not finish in the meantime
+        updated = UploadJob.objects(id=job.id, status__in=["queued", "running"]).update(
+            set__status="failed",
+            set__finished_at=datetime.utcnow(),
+            set__error="Interrupted, as the worker processing the upload exited. Please upload the file again.",
+        )
+        if updated:
+            failed += 1
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
+    return failed
+
+
+@app.cli.command("fail-interrupted-uploads")
+@click.option(
+    "--all-workers",
+    is_flag=True,
+    help="Fail all unfinished uploads of this host, when no web worker is running.",
+)
+def fail_interrupted_uploads(all_workers: bool) -> None:
+    """Mark the uploads of exited web workers as failed, and remove their spooled files."""
+    print(f"Failed interrupted uploads: {fail_interrupted_jobs(all_workers)} jobs")
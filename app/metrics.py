@@ -0,0 +1,237 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from bson import encode
+from flask import Flask, Response, current_app, request
+from pymongo import monitoring
+
+# upper bounds of the histogram buckets, for commands per request and database time (seconds) per request
+COMMAND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class QueryStats:
+    """MongoDB commands sent while handling one request (or background job)."""
+
+    def __init__(self) -> None:
+        self.commands = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # number of commands, by command name (e.g. "find", "aggregate")
+        self.by_command: Dict[str, int] = defaultdict(int)
+
+
+class QueryListener(monitoring.CommandListener):
+    """pymongo command listener, recording commands against the `QueryStats` of the current thread.
+
+    Command events are published on the thread sending the command, so each request (or background
+    job) only sees its own commands. Commands sent outside of `track()` are not recorded.
+
+    Bytes sent and received are only counted if `count_bytes` is set, as pymongo does not report
+    message sizes, and re-encoding every command and reply to BSON costs as much as decoding them.
+    """
+
+    def __init__(self, count_bytes: bool = False) -> None:
+        self.count_bytes = count_bytes
+        self._local = threading.local()
+
+    @property
+    def stats(self) -> Optional[QueryStats]:
+        return getattr(self._local, "stats", None)
+
+    @stats.setter
+    def stats(self, stats: Optional[QueryStats]) -> None:
+        self._local.stats = stats
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        stats = self.stats
+        if stats is not None:
+            stats.commands += 1
+            stats.by_command[event.command_name] += 1
+            if self.count_bytes:
+                stats.bytes_sent += len(encode(event.command))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        stats = self.stats
+        if stats is not None:
+            stats.seconds += event.duration_micros / 1e6
+            if self.count_bytes:
+                stats.bytes_received += len(encode(event.reply))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        stats = self.stats
+        if stats is not None:
+            stats.seconds += event.duration_micros / 1e6
+            stats.failed += 1
+
+
+class Histogram:
+    """Cumulative histogram, in the layout of a Prometheus histogram."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        # one count per bucket, plus one for values above the largest bucket (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> Iterator[Tuple[str, float]]:
+        """Cumulative bucket counts, as (upper bound, count), ending with "+Inf"."""
+        total = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            total += count
+            yield str(bound), total
+
+
+class QueryMetrics:
+    """Thread-safe aggregate of `QueryStats`, by endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.commands: Dict[str, Histogram] = {}
+        self.seconds: Dict[str, Histogram] = {}
+        # totals by (endpoint, command name), and by (endpoint, direction)
+        self.command_totals: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.failed_totals: Dict[str, int] = defaultdict(int)
+        self.byte_totals: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def record(self, endpoint: str, stats: QueryStats) -> None:
+        """Add the commands of one request (or background job) to the totals of `endpoint`."""
+        with self._lock:
+            if endpoint not in self.commands:
+                self.commands[endpoint] = Histogram(COMMAND_BUCKETS)
+                self.seconds[endpoint] = Histogram(SECONDS_BUCKETS)
+            self.commands[endpoint].observe(stats.commands)
+            self.seconds[endpoint].observe(stats.seconds)
+            for command, count in stats.by_command.items():
+                self.command_totals[endpoint, command] += count
+            self.failed_totals[endpoint] += stats.failed
+            # only report bytes of endpoints they were counted for (see `QueryListener.count_bytes`)
+            if stats.bytes_sent or stats.bytes_received:
+                self.byte_totals[endpoint, "sent"] += stats.bytes_sent
+                self.byte_totals[endpoint, "received"] += stats.bytes_received
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, description, histograms in (
+                (
+                    "staycation_db_commands_per_request",
+                    "MongoDB commands sent per request.",
+                    self.commands,
+                ),
+                (
+                    "staycation_db_seconds_per_request",
+                    "Time spent in MongoDB commands per request, in seconds.",
+                    self.seconds,
+                ),
+            ):
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+                for endpoint, histogram in sorted(histograms.items()):
+                    for bound, count in histogram.samples():
+                        lines.append(
+                            f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}'
+                        )
+                    lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{endpoint="{endpoint}"}} {histogram.count}'
+                    )
+            lines += [
+                "# HELP staycation_db_commands_total MongoDB commands sent, by command name.",
+                "# TYPE staycation_db_commands_total counter",
+            ]
+            for (endpoint, command), count in sorted(self.command_totals.items()):
+                lines.append(
+                    f'staycation_db_commands_total{{endpoint="{endpoint}",command="{command}"}} {count}'
+                )
+            lines += [
+                "# HELP staycation_db_failed_commands_total MongoDB commands failed.",
+                "# TYPE staycation_db_failed_commands_total counter",
+            ]
+            for endpoint, count in sorted(self.failed_totals.items()):
+                lines.append(
+                    f'staycation_db_failed_commands_total{{endpoint="{endpoint}"}} {count}'
+                )
+            lines += [
+                "# HELP staycation_db_bytes_total BSON bytes sent to and received from MongoDB.",
+                "# TYPE staycation_db_bytes_total counter",
+            ]
+            for (endpoint, direction), count in sorted(self.byte_totals.items()):
+                lines.append(
+                    f'staycation_db_bytes_total{{endpoint="{endpoint}",direction="{direction}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+# registered globally, so it applies to every client created afterwards
+# (the app package imports this module before connecting to MongoDB)
+query_listener = QueryListener()
+monitoring.register(query_listener)
+query_metrics = QueryMetrics()
+
+
+@contextmanager
+def track(endpoint: str) -> Iterator[QueryStats]:
+    """Record the MongoDB commands sent by the current thread, under `endpoint`.
+
+    Args:
+        endpoint (str): Name to aggregate the commands under, e.g. "upload_job.users".
+
+    Yields:
+        QueryStats: Commands sent so far.
+    """
+    previous, stats = query_listener.stats, QueryStats()
+    query_listener.stats = stats
+    try:
+        yield stats
+    finally:
+        query_listener.stats = previous
+        query_metrics.record(endpoint, stats)
+
+
+def init_metrics(app: Flask) -> None:
+    """Track the MongoDB commands of every request to `app`.
+
+    Requests sending more than `QUERY_BUDGET` commands are logged as warnings, and if
+    `QUERY_DEBUG_HEADER` is set, responses report the number of commands and the database time.
+    Bytes sent to and received from MongoDB are only counted if `QUERY_COUNT_BYTES` is set.
+
+    Args:
+        app (Flask): Flask application.
+    """
+
+    query_listener.count_bytes = app.config["QUERY_COUNT_BYTES"]
+
+    @app.before_request
+    def start_tracking() -> None:
+        query_listener.stats = QueryStats()
+
+    @app.after_request
+    def stop_tracking(response: Response) -> Response:
+        stats, query_listener.stats = query_listener.stats, None
+        if stats is None:
+            return response
+        endpoint = request.endpoint or "unknown"
+        query_metrics.record(endpoint, stats)
+        if stats.commands > current_app.config["QUERY_BUDGET"]:
+            current_app.logger.warning(
+                f"{request.method} {request.path} sent {stats.commands} MongoDB commands "
+                f"(budget {current_app.config['QUERY_BUDGET']}): {dict(stats.by_command)}"
+            )
+        if current_app.config["QUERY_DEBUG_HEADER"]:
+            response.headers["X-DB-Query-Count"] = str(stats.commands)
+            response.headers[
+                "Server-Timing"
+            ] = f'db;dur={stats.seconds * 1000:.2f};desc="{stats.commands} commands"'
+        return response
@@ -0,0 +1,43 @@
+from typing import List, Optional, Tuple
+
+from flask import request
+from flask_mongoengine import BaseQuerySet
+
+from app import app
+
+
+def page_size() -> int:
+    """Retrieve the page size requested with the `limit` query parameter.
+
+    Returns:
+        int: Requested page size, defaults to `PAGE_SIZE` and capped at `PAGE_SIZE_MAX` in app config.
+    """
+    limit = request.args.get("limit", app.config["PAGE_SIZE"], type=int)
+    return min(max(1, limit), app.config["PAGE_SIZE_MAX"])
+
+
+def keyset_page(
+    queryset: BaseQuerySet, field: str, after: Optional[str], limit: int
+) -> Tuple[list, Optional[str]]:
+    """Retrieve a page of documents ordered by `field`, starting after the cursor `after`.
+
+    Unlike skip/offset pagination, each page is a single indexed range read on `field`, so the
+    cost of a page does not grow with its position. Documents sharing the same `field` value
+    across a page boundary are not repeated, so `field` should be (mostly) unique.
+
+    Args:
+        queryset (BaseQuerySet): Documents to paginate, e.g. `Staycation.objects.only("hotel_name")`.
+        field (str): Field to order and paginate by, e.g. `hotel_name`.
+        after (Optional[str]): Value of `field` of the last document on the previous page, None for the first page.
+        limit (int): Maximum number of documents per page.
+
+    Returns:
+        Tuple[list, Optional[str]]: Documents on the page, and the cursor of the next page (None if last page).
+    """
+    if after is not None:
+        queryset = queryset.filter(**{f"{field}__gt": after})
+    # fetch one extra document, to know whether there is a next page
+    documents: List = list(queryset.order_by(field).limit(limit + 1))
+    if len(documents) > limit:
+        return documents[:limit], documents[limit - 1][field]
+    return documents, None
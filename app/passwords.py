@@ -0,0 +1,27 @@
+from typing import List
+
+from werkzeug.security import generate_password_hash
+
+
+def hash_password(password: str) -> str:
+    """Hash a password for a new `User`.
+
+    Args:
+        password (str): Plain-text password from the uploaded CSV file.
+
+    Returns:
+        str: Salted password hash, as stored in `User.password`.
+    """
+    return generate_password_hash(password, method="sha256")
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a slice of passwords in a single task, so a worker process pays IPC once per slice.
+
+    Args:
+        passwords (List[str]): Plain-text passwords from the uploaded CSV file.
+
+    Returns:
+        List[str]: Salted password hashes, in the same order.
+    """
+    return [hash_password(password) for password in passwords]
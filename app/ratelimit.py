@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Response, request
+
+from app import app
+
+
+class MemoryBackend:
+    """Thread-safe, in-memory token buckets, private to the current process.
+
+    At most `maxsize` buckets are kept (least recently used first out), so a flood of distinct keys
+    (e.g. spoofed emails) cannot grow memory without bound. An evicted bucket starts again full.
+    """
+
+    def __init__(self, maxsize: int = 100000) -> None:
+        self.maxsize = maxsize
+        # map of key -> (tokens, time of the last update), ordered from least to most recently used
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Take a token from the bucket of `key`, refilled at `rate` tokens per second up to `capacity`.
+
+        Args:
+            key (str): Bucket key, e.g. "ip:10.0.0.1".
+            capacity (float): Maximum number of tokens, i.e. the allowed burst.
+            rate (float): Tokens added per second.
+            now (float): Current time, in seconds since the epoch.
+
+        Returns:
+            float: 0 if a token was taken, else the number of seconds until a token is available.
+        """
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            taken = tokens >= 1
+            self._buckets[key] = (tokens - 1 if taken else tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return 0.0 if taken else (1 - tokens) / rate
+
+
+class SQLiteBackend:
+    """Token buckets in a local SQLite database, shared by all worker processes on the host.
+
+    Each token is taken in a single write transaction, so concurrent workers do not over-grant.
+    Buckets that are full again are removed from time to time, to keep the database small.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the current thread, as SQLite connections cannot be shared across threads."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # transactions are started explicitly, so they take the write lock up front
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Take a token from the bucket of `key`, as `MemoryBackend.take()`."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            taken = tokens >= 1
+            if taken:
+                tokens -= 1
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                connection.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return 0.0 if taken else (1 - tokens) / rate
+
+
+class RateLimiter:
+    """Token-bucket rate limiter, with one bucket per (scope, key), e.g. ("ip", "10.0.0.1").
+
+    Each scope allows a burst of `capacity` requests, refilled evenly over `period` seconds.
+    Rejected requests are counted by endpoint and scope, for `/metrics`.
+    """
+
+    def __init__(self, backend, limits: Dict[str, Tuple[int, float]]) -> None:
+        self.backend = backend
+        # map of scope -> (capacity, period in seconds)
+        self.limits = limits
+        self._lock = threading.Lock()
+        self.rejected: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def check(self, endpoint: str, keys: Dict[str, Optional[str]]) -> float:
+        """Take a token from the bucket of each key, stopping at the first empty bucket.
+
+        Args:
+            endpoint (str): Endpoint of the request, to count rejections by.
+            keys (Dict[str, Optional[str]]): Key of the request in each scope, e.g. {"ip": "10.0.0.1",
+                "email": "user@abc.com"}. Scopes without a key or a limit are skipped.
+
+        Returns:
+            float: 0 if the request is allowed, else the number of seconds to wait before retrying.
+        """
+        now = time()
+        for scope, key in keys.items():
+            if not key or scope not in self.limits:
+                continue
+            capacity, period = self.limits[scope]
+            retry_after = self.backend.take(
+                f"{scope}:{key}", capacity, capacity / period, now
+            )
+            if retry_after:
+                with self._lock:
+                    self.rejected[endpoint, scope] += 1
+                return retry_after
+        return 0.0
+
+    def to_prometheus(self) -> str:
+        """Render the rejected requests in the Prometheus text exposition format."""
+        lines: List[str] = [
+            "# HELP staycation_rate_limited_total Requests rejected by the rate limiter, by scope.",
+            "# TYPE staycation_rate_limited_total counter",
+        ]
+        with self._lock:
+            for (endpoint, scope), count in sorted(self.rejected.items()):
+                lines.append(
+                    f'staycation_rate_limited_total{{endpoint="{endpoint}",scope="{scope}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _create_backend():
+    """Build the backend selected by `RATE_LIMIT_BACKEND` in app config."""
+    if app.config["RATE_LIMIT_BACKEND"] == "sqlite":
+        return SQLiteBackend(app.config["RATE_LIMIT_PATH"])
+    return MemoryBackend(app.config["RATE_LIMIT_MAX_KEYS"])
+
+
+limiter = RateLimiter(
+    _create_backend(),
+    {
+        "ip": app.config["RATE_LIMIT_BY_IP"],
+        "email": app.config["RATE_LIMIT_BY_EMAIL"],
+    },
+)
+
+
+def rate_limited(view: Callable) -> Callable:
+    """Rate limit the POST requests of a view by client IP and by the `email` form field.
+
+    Requests over the limit are answered with `429 Too Many Requests` and a `Retry-After` header,
+    before the view runs, so they cost no password hashing or database query.
+
+    Args:
+        view (Callable): View function, e.g. `auth.login`.
+
+    Returns:
+        Callable: The rate limited view function.
+    """
+
+    @wraps(view)
+    def limited_view(*args, **kwargs):
+        if request.method == "POST" and app.config["RATE_LIMIT_ENABLED"]:
+            retry_after = limiter.check(
+                request.endpoint,
+                {
+                    "ip": request.remote_addr,
+                    "email": request.form.get("email", "").strip().lower(),
+                },
+            )
+            if retry_after:
+                response = Response("Too Many Requests", 429, mimetype="text/plain")
+                response.headers["Retry-After"] = str(int(retry_after) + 1)
+                return response
+        return view(*args, **kwargs)
+
+    return limited_view
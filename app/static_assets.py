@@ -0,0 +1,153 @@
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from typing import Dict, List
+
+from flask import Flask, Response, request, send_from_directory
+
+from app import app
+from compression import brotli, compress
+
+# fingerprinted assets are written to (and served from) this subdirectory of the static folder
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+# text assets are precompressed, images are already compressed
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".csv"}
+# fingerprinted assets never change, a new version gets a new name
+IMMUTABLE = "public, max-age=31536000, immutable"
+CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)""")
+
+
+def _fingerprint(path: str, content: bytes) -> str:
+    """Name of an asset, with the hash of its content, e.g. "js/dashboard.3f2a1b9c04d7.js"."""
+    root, extension = posixpath.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def _rewrite_css(css: str, source: str, manifest: Dict[str, str]) -> str:
+    """Point the relative `url()` references of a stylesheet to the fingerprinted assets."""
+
+    def fingerprinted(match: re.Match) -> str:
+        url = match.group(1)
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        asset = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        if asset not in manifest:
+            return match.group(0)
+        # the stylesheet and the asset are both in the build directory, with the same layout
+        relative = posixpath.relpath(
+            manifest[asset], posixpath.dirname(f"{BUILD_DIR}/{source}")
+        )
+        return f"url({relative})"
+
+    return CSS_URL.sub(fingerprinted, css)
+
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """Copy each static asset to a content-hashed name, and precompress the text assets.
+
+    Assets are written to the `build` subdirectory of `static_folder`, along with a manifest of
+    asset name -> fingerprinted name, used by `url_for("static", ...)` once the app is restarted.
+
+    Args:
+        static_folder (str): Static folder of the app, e.g. `app/assets`.
+
+    Returns:
+        Dict[str, str]: Manifest of asset name -> fingerprinted name, relative to `static_folder`.
+    """
+    build = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(build, ignore_errors=True)
+    sources: List[str] = []
+    for directory, _, files in os.walk(static_folder):
+        relative = os.path.relpath(directory, static_folder).replace(os.sep, "/")
+        sources += [
+            posixpath.normpath(posixpath.join(relative, name)) for name in files
+        ]
+    # stylesheets last, so the assets they reference are already fingerprinted
+    sources.sort(key=lambda source: (source.endswith(".css"), source))
+    manifest = {}
+    for source in sources:
+        with open(os.path.join(static_folder, source), "rb") as asset:
+            content = asset.read()
+        if source.endswith(".css"):
+            content = _rewrite_css(content.decode(), source, manifest).encode()
+        target = os.path.join(build, _fingerprint(source, content))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as asset:
+            asset.write(content)
+        if posixpath.splitext(source)[1] in COMPRESSIBLE:
+            # compressed once, so at the highest levels
+            with open(f"{target}.gz", "wb") as asset:
+                asset.write(compress(content, "gzip", 9))
+            # brotli variants are only built if brotli is installed
+            if brotli is not None:
+                with open(f"{target}.br", "wb") as asset:
+                    asset.write(compress(content, "br", 11))
+        manifest[source] = f"{BUILD_DIR}/{_fingerprint(source, content)}"
+    with open(os.path.join(build, MANIFEST), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+def init_assets(app: Flask) -> None:
+    """Serve the fingerprinted assets built by `flask build-assets`, if `FINGERPRINT_ASSETS` is set.
+
+    `url_for("static", filename=...)` then points to the fingerprinted asset, which is served with
+    immutable, year-long cache headers, and precompressed (brotli or gzip) if the client accepts it.
+
+    Args:
+        app (Flask): Flask application.
+    """
+    manifest_path = os.path.join(app.static_folder, BUILD_DIR, MANIFEST)
+    if not app.config["FINGERPRINT_ASSETS"] or not os.path.exists(manifest_path):
+        return
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    # precompressed variants of each fingerprinted asset, as (encoding, file name), preferred first
+    variants = {
+        target: [
+            (encoding, f"{target}{extension}")
+            for encoding, extension in (("br", ".br"), ("gzip", ".gz"))
+            if os.path.exists(os.path.join(app.static_folder, f"{target}{extension}"))
+        ]
+        for target in manifest.values()
+    }
+
+    @app.url_defaults
+    def fingerprint_static(endpoint: str, values: dict) -> None:
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    def send_static_file(filename: str) -> Response:
+        if filename not in variants:
+            return app.send_static_file(filename)
+        for encoding, variant in variants[filename]:
+            if request.accept_encodings[encoding]:
+                response = send_from_directory(
+                    app.static_folder,
+                    variant,
+                    mimetype=mimetypes.guess_type(filename)[0],
+                    download_name=posixpath.basename(filename),
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename)
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    app.view_functions["static"] = send_static_file
+
+
+@app.cli.command("build-assets")
+def build_assets_command() -> None:
+    """Fingerprint and precompress the static assets."""
+    manifest = build_assets(app.static_folder)
+    print(
+        f"Built {len(manifest)} assets in {os.path.join(app.static_folder, BUILD_DIR)}"
+    )
@@ -1,9 +1,26 @@
-from typing import Callable
+import hashlib
+import re
+from collections import defaultdict
+from math import inf
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
-from app import db
-from flask import Blueprint, render_template, request
+from bson import ObjectId
+
+from app import app, db
+from cache import DataVersion, ResultCache
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+)
 from flask_login import current_user, login_required
-from flask_mongoengine import BaseQuerySet
+from pagination import keyset_page, page_size
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import is_resource_modified
 from werkzeug.local import LocalProxy
 
 # record all operations to execute when Staycation related operations are performed
@@ -32,10 +49,28 @@ class Staycation(db.Document):
         3. `unit_cost`: The daily unit cost of the staycation package, corresponding to `unit_cost` in raw data.
         4. `image_url`: The image url for the staycation display image, corresponding to `image_url` in raw data.
         5. `description`: The description of the staycation package, corresponding to `description` in raw data.
+
+    The optional `rooms` field is the number of rooms available per check-in date, corresponding to the
+    (optional) `rooms` column in raw data, and defaults to `DEFAULT_ROOMS` in app config.
     """
 
     # all `Staycation` objects are stored as documents in collection `staycation`
-    meta = {"collection": "staycation"}
+    # `hotel_name` is unique, as it identifies the package to book
+    # `unit_cost` and `duration` are indexed for the price and duration filters of the catalog search,
+    # and `hotel_name` and `description` are searched with a text index (hotel names weighted higher)
+    meta = {
+        "collection": "staycation",
+        "indexes": [
+            {"fields": ["hotel_name"], "unique": True},
+            {"fields": ["unit_cost", "hotel_name"]},
+            {"fields": ["duration", "unit_cost"]},
+            {
+                "fields": ["$hotel_name", "$description"],
+                "default_language": "english",
+                "weights": {"hotel_name": 3, "description": 1},
+            },
+        ],
+    }
     # `hotel_name` field is a String field, which is a Python string object, with max length of 30 characters
     hotel_name = db.StringField(max_length=30)
     # `duration` is a Integer field, which is a Python integer object
@@ -46,22 +81,382 @@ class Staycation(db.Document):
     image_url = db.StringField(max_length=30)
     # `description` is a String field, which is a Python string object, with max length of 500 characters
     description = db.StringField(max_length=500)
+    # `rooms` is an (optional) Integer field, the number of rooms available for booking per check-in date
+    # defaults to `DEFAULT_ROOMS` in app config if not provided in raw data
+    rooms = db.IntField(min_value=1)
+
+
+# staycation packages, keyed by the "staycation" data version they were loaded at
+catalog_cache = ResultCache(maxsize=256, ttl=app.config["CATALOG_CACHE_TTL"])
+# catalog search results, kept apart so searches do not evict the packages cached by hotel name
+search_cache = ResultCache(maxsize=1024, ttl=app.config["CATALOG_CACHE_TTL"])
+# inverted index of the catalog (see `CatalogIndex`), for the latest "staycation" data version
+index_cache = ResultCache(maxsize=1, ttl=app.config["CATALOG_CACHE_TTL"])
+
+
+def load_catalog(
+    after: Optional[str], limit: int
+) -> Tuple[List[Staycation], Optional[str]]:
+    """Retrieve a page of staycation packages ordered by hotel name, from `catalog_cache` if the
+    catalog has not changed since.
+
+    Args:
+        after (Optional[str]): Last hotel name of the previous page, None for the first page.
+        limit (int): Maximum number of packages per page.
+
+    Returns:
+        Tuple[List[Staycation], Optional[str]]: Packages on the page, and the cursor of the next page (None if last page).
+    """
+    return catalog_cache.get_or_compute(
+        (DataVersion.current("staycation"), after, limit),
+        lambda: keyset_page(Staycation.objects, "hotel_name", after, limit),
+    )
+
+
+def find_staycation(hotel_name: str) -> Optional[Staycation]:
+    """Retrieve a staycation package by hotel name, from `catalog_cache` if the catalog has not changed since.
+
+    Args:
+        hotel_name (str): Name of the hotel.
+
+    Returns:
+        Optional[Staycation]: Staycation package, None if there is no such hotel.
+    """
+    return catalog_cache.get_or_compute(
+        (DataVersion.current("staycation"), "hotel", hotel_name),
+        lambda: Staycation.objects(hotel_name=hotel_name).first(),
+    )
+
+
+# sort orders of the catalog search, ties broken by hotel name ("relevance" requires search terms)
+CATALOG_SORTS = {
+    "name": ["hotel_name"],
+    "price": ["unit_cost", "hotel_name"],
+    "-price": ["-unit_cost", "hotel_name"],
+    "duration": ["duration", "hotel_name"],
+    "relevance": ["$text_score", "hotel_name"],
+}
+# words too common to be indexed by the inverted index, as with the english text index of MongoDB
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the to with".split()
+)
+
+
+class CatalogQuery(NamedTuple):
+    """Search terms, filters, sort order and page of a catalog search.
+
+    The fields of the `CatalogQuery` are:
+        1. `text`: Search terms, matched against `hotel_name` and `description` (any term).
+        2. `min_price`, `max_price`: Range of the daily unit cost (`unit_cost`), inclusive.
+        3. `min_duration`, `max_duration`: Range of the stay duration (`duration`), inclusive.
+        4. `sort`: Sort order, a key of `CATALOG_SORTS`.
+        5. `offset`, `limit`: Number of packages to skip, and maximum number of packages per page.
+    """
+
+    text: Optional[str]
+    min_price: Optional[float]
+    max_price: Optional[float]
+    min_duration: Optional[int]
+    max_duration: Optional[int]
+    sort: str
+    offset: int
+    limit: int
+
+    @classmethod
+    def from_args(cls, args: MultiDict) -> Optional["CatalogQuery"]:
+        """Read a catalog search from the query parameters of a request.
+
+        Args:
+            args (MultiDict): `request.args`, with optional `q`, `min_price`, `max_price`, `min_duration`,
+                `max_duration`, `sort` and `offset` (and `limit`, see `page_size()`).
+
+        Raises:
+            ValueError: If the sort order is unknown, or "relevance" without search terms.
+
+        Returns:
+            Optional[CatalogQuery]: Catalog search, None if no search term, filter or sort order is given.
+        """
+        if not any(
+            args.get(name)
+            for name in (
+                "q",
+                "min_price",
+                "max_price",
+                "min_duration",
+                "max_duration",
+                "sort",
+            )
+        ):
+            return None
+        text = args.get("q", "").strip() or None
+        sort = args.get("sort") or ("relevance" if text else "name")
+        if sort not in CATALOG_SORTS or (sort == "relevance" and not text):
+            raise ValueError(f"invalid sort: {sort}")
+        return cls(
+            text,
+            args.get("min_price", type=float),
+            args.get("max_price", type=float),
+            args.get("min_duration", type=int),
+            args.get("max_duration", type=int),
+            sort,
+            max(0, args.get("offset", 0, type=int)),
+            page_size(),
+        )
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into lowercase words, without stop words."""
+    return [
+        word
+        for word in re.findall(r"[a-z0-9]+", text.lower())
+        if word not in STOP_WORDS
+    ]
+
+
+class CatalogIndex:
+    """In-memory inverted index of the staycation catalog, for servers without a text index (e.g. mongomock).
+
+    Maps each word of `hotel_name` and `description` to the packages containing it, with a score
+    weighted as the text index (3 per occurrence in the hotel name, 1 in the description). Unlike
+    the text index, words are not stemmed. The hotel name, daily unit cost and duration of each
+    package are kept as well, so matches are filtered and sorted without querying the database.
+    """
+
+    def __init__(
+        self, staycations: Iterable[Tuple[ObjectId, str, str, float, int]]
+    ) -> None:
+        # map of word -> {package id: score}
+        self.postings: Dict[str, Dict[ObjectId, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        # map of package id -> (hotel name, unit cost, duration)
+        self.packages: Dict[ObjectId, Tuple[str, float, int]] = {}
+        for staycation_id, hotel_name, description, unit_cost, duration in staycations:
+            self.packages[staycation_id] = (hotel_name, unit_cost or 0.0, duration or 0)
+            for weight, field in ((3, hotel_name), (1, description)):
+                for word in _tokenize(field or ""):
+                    self.postings[word][staycation_id] += weight
+
+    def search(self, query: CatalogQuery) -> List[ObjectId]:
+        """Find the packages matching any search term and the filters of `query`, in its sort order.
+
+        Args:
+            query (CatalogQuery): Search terms, filters and sort order.
+
+        Returns:
+            List[ObjectId]: Ids of the matching packages, sorted.
+        """
+        scores: Dict[ObjectId, float] = defaultdict(float)
+        for word in set(_tokenize(query.text or "")):
+            for staycation_id, score in self.postings.get(word, {}).items():
+                scores[staycation_id] += score
+        low_price = -inf if query.min_price is None else query.min_price
+        high_price = inf if query.max_price is None else query.max_price
+        low_duration = -inf if query.min_duration is None else query.min_duration
+        high_duration = inf if query.max_duration is None else query.max_duration
+        matches = [
+            staycation_id
+            for staycation_id in scores
+            if low_price <= self.packages[staycation_id][1] <= high_price
+            and low_duration <= self.packages[staycation_id][2] <= high_duration
+        ]
+        sort_keys = {
+            "name": lambda staycation_id: (self.packages[staycation_id][0],),
+            "price": lambda staycation_id: (
+                self.packages[staycation_id][1],
+                self.packages[staycation_id][0],
+            ),
+            "-price": lambda staycation_id: (
+                -self.packages[staycation_id][1],
+                self.packages[staycation_id][0],
+            ),
+            "duration": lambda staycation_id: (
+                self.packages[staycation_id][2],
+                self.packages[staycation_id][0],
+            ),
+            "relevance": lambda staycation_id: (
+                -scores[staycation_id],
+                self.packages[staycation_id][0],
+            ),
+        }
+        return sorted(matches, key=sort_keys[query.sort])
+
+
+def _catalog_index() -> CatalogIndex:
+    """Retrieve the inverted index of the catalog, built once per "staycation" data version."""
+    return index_cache.get_or_compute(
+        DataVersion.current("staycation"),
+        lambda: CatalogIndex(
+            Staycation.objects.scalar(
+                "id", "hotel_name", "description", "unit_cost", "duration"
+            )
+        ),
+    )
+
+
+def _search_catalog(query: CatalogQuery) -> Tuple[List[Staycation], Optional[int]]:
+    """Run a catalog search against the database (or the inverted index), see `search_catalog()`."""
+    if query.text and app.config["CATALOG_SEARCH"] == "inverted":
+        # fetch one extra package, to know whether there is a next page
+        page = _catalog_index().search(query)[
+            query.offset : query.offset + query.limit + 1
+        ]
+        packages = {
+            staycation.pk: staycation for staycation in Staycation.objects(id__in=page)
+        }
+        staycations = [
+            packages[staycation_id]
+            for staycation_id in page
+            if staycation_id in packages
+        ]
+    else:
+        queryset = Staycation.objects
+        if query.min_price is not None:
+            queryset = queryset.filter(unit_cost__gte=query.min_price)
+        if query.max_price is not None:
+            queryset = queryset.filter(unit_cost__lte=query.max_price)
+        if query.min_duration is not None:
+            queryset = queryset.filter(duration__gte=query.min_duration)
+        if query.max_duration is not None:
+            queryset = queryset.filter(duration__lte=query.max_duration)
+        if query.text:
+            queryset = queryset.search_text(query.text)
+        # fetch one extra package, to know whether there is a next page
+        staycations = list(
+            queryset.order_by(*CATALOG_SORTS[query.sort])
+            .skip(query.offset)
+            .limit(query.limit + 1)
+        )
+    if len(staycations) > query.limit:
+        return staycations[: query.limit], query.offset + query.limit
+    return staycations, None
+
+
+def search_catalog(query: CatalogQuery) -> Tuple[List[Staycation], Optional[int]]:
+    """Search, filter and sort the staycation catalog, from `search_cache` if the catalog has not changed since.
+
+    Search terms are matched with the text index of MongoDB, or with an in-memory inverted index of
+    the catalog (see `CatalogIndex`) if `CATALOG_SEARCH` is "inverted" in app config. Price and duration
+    filters, and sort orders other than relevance, are served by the indexes on `unit_cost` and `duration`.
+
+    Args:
+        query (CatalogQuery): Search terms, filters, sort order and page.
+
+    Returns:
+        Tuple[List[Staycation], Optional[int]]: Packages on the page, and the offset of the next page (None if last page).
+    """
+    return search_cache.get_or_compute(
+        (DataVersion.current("staycation"), query),
+        lambda: _search_catalog(query),
+    )
 
 
 @staycation.route("/products")
 @login_required
-def render_product() -> Callable[[str, BaseQuerySet, LocalProxy, str], str]:
+def render_product() -> Union[
+    Callable[[str, List[Staycation], LocalProxy, str], str], Response
+]:
     """Packages (products) route endpoint.
 
+    The page is served with an `ETag` (the catalog version, user and query) and `Last-Modified` (the latest
+    staycation upload), so repeat visits are answered with `304 Not Modified` without rendering.
+
+    Packages are listed by hotel name, one page at a time, or searched, filtered and sorted (see `search_catalog()`).
+
+    Args:
+        GET: /products?after=<hotel_name>&limit=<limit>
+        GET: /products?q=<terms>&min_price=<price>&max_price=<price>&min_duration=<days>&max_duration=<days>
+            &sort=<name|price|-price|duration|relevance>&offset=<offset>&limit=<limit>
+
+    Returns:
+        Union[Callable[[str, List[Staycation], LocalProxy, str], str], Response]: Renders the Packages page
+            using `products.hmtl` template, or an empty `304 Not Modified` response.
+    """
+    try:
+        query = CatalogQuery.from_args(request.args)
+    except ValueError:
+        abort(400)
+    after, limit = request.args.get("after"), page_size()
+    # the page shows the user in the sidebar, so the user is part of the validator
+    etag = (
+        f"products-{DataVersion.current('staycation')}-{current_user.get_id()}-"
+        f"{hashlib.sha1(request.query_string).hexdigest()[:16]}"
+    )
+    last_modified = DataVersion.last_modified("staycation")
+    if not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    ):
+        response = Response(status=304)
+    else:
+        # retrieve a page of products from db (or the cached catalog)
+        next_offset = None
+        if query is None:
+            products, next_after = load_catalog(after, limit)
+        else:
+            (products, next_offset), next_after = search_catalog(query), None
+        # return products html page by default
+        response = make_response(
+            render_template(
+                "packages.html",
+                products=products,
+                next_after=next_after,
+                next_offset=next_offset,
+                # search parameters, kept on the link to the next page
+                search={
+                    name: value
+                    for name, value in request.args.items()
+                    if name not in ("after", "offset")
+                },
+                limit=limit,
+                user=current_user,
+                panel="Products",
+            )
+        )
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # pages are per user, and must be revalidated on each visit
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@staycation.route("/api/products")
+@login_required
+def list_products() -> Union[
+    Callable[[dict], dict], Tuple[Callable[[dict], dict], int]
+]:
+    """Packages (products) JSON route endpoint.
+
     Args:
-        GET: /products
+        GET: /api/products?after=<hotel_name>&limit=<limit>
+        GET: /api/products?q=<terms>&min_price=<price>&max_price=<price>&min_duration=<days>&max_duration=<days>
+            &sort=<name|price|-price|duration|relevance>&offset=<offset>&limit=<limit>
 
     Returns:
-        Callable[[str, BaseQuerySet, LocalProxy, str], str]: Renders the Packages page using `products.hmtl` template.
+        Union[Callable[[dict], dict], Tuple[Callable[[dict], dict], int]]: Json payload of a page of packages
+            and the cursor of the next page (the `after` hotel name, or the `offset` of a search), or status 400
+            if the sort order is invalid.
     """
-    # retrieve all products from db
-    products = Staycation.objects()
-    # return products html page by default
-    return render_template(
-        "packages.html", products=products, user=current_user, panel="Products"
+    try:
+        query = CatalogQuery.from_args(request.args)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    if query is None:
+        products, next_page = load_catalog(request.args.get("after"), page_size())
+    else:
+        products, next_page = search_catalog(query)
+    return jsonify(
+        {
+            "products": [
+                {
+                    "hotel_name": product.hotel_name,
+                    "duration": product.duration,
+                    "unit_cost": product.unit_cost,
+                    "image_url": product.image_url,
+                    "description": product.description,
+                }
+                for product in products
+            ],
+            "next": next_page,
+        }
     )
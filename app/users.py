@@ -1,4 +1,5 @@
-from app import db
+from app import app, db
+from cache import ResultCache
 from flask_login import UserMixin
 
 
@@ -26,10 +27,36 @@ class User(UserMixin, db.Document):
     """
 
     # all `User` objects are store as documents in collection `appUsers`
-    meta = {"collection": "appUsers"}
+    # `email` is unique, as it identifies the user on login, and `name` is indexed for dashboard lookups
+    meta = {
+        "collection": "appUsers",
+        "indexes": [{"fields": ["email"], "unique": True}, "name"],
+    }
     # `email` is a String field, which is a Python string object, with max length of 30 characters
     email = db.StringField(max_length=30)
     # `password` is a String field, which is a Python string object
     password = db.StringField()
     # `name` is a String field, which is a Python string object
     name = db.StringField()
+
+
+# users loaded for logged in sessions, keyed by user id
+user_cache = ResultCache(
+    maxsize=app.config["USER_CACHE_SIZE"], ttl=app.config["USER_CACHE_TTL"]
+)
+
+
+def load_session_user(user_id: str) -> User:
+    """Retrieve the user of a logged in session, from `user_cache` if possible.
+
+    The password hash is not loaded, as it is only required on login.
+
+    Args:
+        user_id (str): _id of User object in `User` document.
+
+    Returns:
+        User: User object without `password`, or None if there is no such user.
+    """
+    return user_cache.get_or_compute(
+        user_id, lambda: User.objects(pk=user_id).exclude("password").first()
+    )
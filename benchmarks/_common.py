@@ -0,0 +1,151 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks import the application modules directly (as `start.sh` does with `PYTHONPATH=./app`)
+and run against either a local MongoDB (`--host mongodb://localhost:27017`) or an in-memory
+`mongomock` stand-in (`--host mongomock://localhost`, requires `pip install mongomock`).
+"""
+import argparse
+import importlib.util
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from statistics import mean, median
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the project root must come first, so `app` resolves to the package rather than `app/app.py`
+sys.path[:0] = [ROOT, os.path.join(ROOT, "app")]
+
+
+def parser(description: str) -> argparse.ArgumentParser:
+    """Build an argument parser with the options shared by all benchmarks."""
+    arg_parser = argparse.ArgumentParser(description=description)
+    arg_parser.add_argument(
+        "--host", default="mongomock://localhost", help="MongoDB connection URI"
+    )
+    arg_parser.add_argument("--db", default="eca_bench", help="database to seed")
+    arg_parser.add_argument("--seed", type=int, default=239, help="random seed")
+    return arg_parser
+
+
+def connect(host: str, db: str) -> None:
+    """Point the application's default MongoEngine connection at the benchmark database."""
+    import mongoengine
+
+    import app  # noqa: F401, creates the Flask app and registers the default connection
+
+    mongoengine.disconnect_all()
+    mongoengine.connect(db, host=host)
+
+
+def load_app():
+    """Import the Flask application (`app/app.py`, as `FLASK_APP` in `start.sh`) with all routes registered.
+
+    Must be called after `connect()`, so the application uses the benchmark database.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "staycation_app", os.path.join(ROOT, "app", "app.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def seed(users: int, hotels: int, bookings: int, seed: int = 239) -> None:
+    """Replace the `appUsers`, `staycation` and `booking` collections with synthetic data.
+
+    Documents are written with raw `insert_many` calls, so seeding does not go through (and is not
+    slowed down by) the application's write paths.
+
+    Args:
+        users (int): Number of users to create.
+        hotels (int): Number of staycation packages to create.
+        bookings (int): Number of bookings to create, spread uniformly over users, hotels and one year.
+        seed (int): Random seed, for reproducible data sets.
+    """
+    from werkzeug.security import generate_password_hash
+
+    from book import Booking, DailyRevenue
+    from staycation import Staycation
+    from users import User
+
+    rng = random.Random(seed)
+    # every user shares the password "12345", hashed once so seeding does not pay for hashing
+    hashpass = generate_password_hash("12345", method="sha256")
+    for model in (User, Staycation, Booking, DailyRevenue):
+        model.drop_collection()
+    user_ids = (
+        User._get_collection()
+        .insert_many(
+            [
+                {
+                    "email": f"user{i}@bench.com",
+                    "password": hashpass,
+                    "name": f"User {i}",
+                }
+                for i in range(users)
+            ]
+        )
+        .inserted_ids
+    )
+    packages = [
+        {
+            "hotel_name": f"Hotel {i}",
+            "duration": rng.randint(1, 5),
+            "unit_cost": float(rng.randint(100, 900)),
+            "image_url": "https://bit.ly/3Ifjcn6",
+            "description": f"Staycation package {i} with breakfast and late check-out.",
+        }
+        for i in range(hotels)
+    ]
+    hotel_ids = Staycation._get_collection().insert_many(packages).inserted_ids
+    start = datetime(2022, 1, 1)
+    collection = Booking._get_collection()
+    batch = []
+    for _ in range(bookings):
+        index = rng.randrange(hotels)
+        check_in_date = start + timedelta(days=rng.randrange(365))
+        customer = rng.randrange(users)
+        batch.append(
+            {
+                "check_in_date": check_in_date,
+                "customer": user_ids[customer],
+                "package": hotel_ids[index],
+                "total_cost": packages[index]["duration"]
+                * packages[index]["unit_cost"],
+                # snapshot of the customer and package, as `Booking.take_snapshot()`
+                "customer_name": f"User {customer}",
+                "hotel_name": packages[index]["hotel_name"],
+                "unit_cost": packages[index]["unit_cost"],
+                "duration": packages[index]["duration"],
+            }
+        )
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    DailyRevenue.rebuild()
+
+
+def timeit(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Time `repeat` calls of `function`, returning summary statistics in milliseconds."""
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append((perf_counter() - start) * 1000)
+    return {
+        "mean_ms": mean(timings),
+        "median_ms": median(timings),
+        "min_ms": min(timings),
+    }
+
+
+def percentile(timings: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of `timings`, e.g. `percentile(timings, 95)` for the p95."""
+    ordered = sorted(timings)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
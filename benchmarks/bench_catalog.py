@@ -0,0 +1,107 @@
+"""Benchmark of the catalog search (text search, price and duration filters, sorting) at scale.
+
+Seeds 10k+ staycation packages with varied descriptions, then times a page of each search with
+`staycation._search_catalog()` (uncached), against reading the whole catalog (as `/products` used to)
+and filtering it in Python. Search terms are matched with the MongoDB text index (`--search text`,
+requires a running MongoDB) or the in-memory inverted index (`--search inverted`, the default with mongomock).
+
+Usage:
+    python benchmarks/bench_catalog.py --hotels 10000 20000 --host mongodb://localhost:27017 --search text inverted
+"""
+import random
+from time import perf_counter
+
+from pymongo import UpdateOne
+
+from _common import connect, parser, seed, timeit
+
+WORDS = (
+    "spa pool breakfast buffet family suite sea view city skyline rooftop bar garden "
+    "villa heritage boutique luxury budget romantic getaway kids club gym late check-out "
+    "dinner lounge beach island river marina club access wellness massage"
+).split()
+
+# searches to time, as (name, query fields)
+SEARCHES = [
+    ("text", {"text": "spa massage"}),
+    ("price range", {"min_price": 300.0, "max_price": 400.0, "sort": "price"}),
+    ("duration, by -price", {"min_duration": 3, "max_duration": 4, "sort": "-price"}),
+    ("text and price", {"text": "family pool", "max_price": 500.0}),
+]
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--hotels", type=int, nargs="+", default=[10000])
+    arg_parser.add_argument("--search", nargs="+", help="text and/or inverted")
+    arg_parser.add_argument("--limit", type=int, default=20, help="packages per page")
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    args = arg_parser.parse_args()
+    backends = args.search or (
+        ["inverted"] if args.host.startswith("mongomock://") else ["text", "inverted"]
+    )
+
+    connect(args.host, args.db)
+
+    from app import app
+    from staycation import CatalogQuery, Staycation, _catalog_index, _search_catalog
+
+    def full_scan(fields: dict) -> list:
+        words = set(fields.get("text", "").split())
+        return [
+            staycation
+            for staycation in Staycation.objects
+            if (not words or words & set(staycation.description.split()))
+            and fields.get("min_price", 0) <= staycation.unit_cost
+            and staycation.unit_cost <= fields.get("max_price", float("inf"))
+            and fields.get("min_duration", 0) <= staycation.duration
+            and staycation.duration <= fields.get("max_duration", 1000)
+        ][: args.limit]
+
+    print(
+        f"{'hotels':<8}{'search':<22}{'implementation':<16}{'median ms':>12}{'min ms':>12}"
+    )
+    for hotels in args.hotels:
+        seed(1, hotels, 0, args.seed)
+        rng = random.Random(args.seed)
+        Staycation.ensure_indexes()
+        Staycation._get_collection().bulk_write(
+            [
+                UpdateOne(
+                    {"hotel_name": f"Hotel {i}"},
+                    {"$set": {"description": " ".join(rng.sample(WORDS, 8))}},
+                )
+                for i in range(hotels)
+            ]
+        )
+        if "inverted" in backends:
+            start = perf_counter()
+            _catalog_index()
+            print(
+                f"{hotels:<8}{'(build index)':<22}{'inverted':<16}"
+                f"{(perf_counter() - start) * 1000:>12.2f}"
+            )
+        for name, fields in SEARCHES:
+            query = CatalogQuery(
+                fields.get("text"),
+                fields.get("min_price"),
+                fields.get("max_price"),
+                fields.get("min_duration"),
+                fields.get("max_duration"),
+                fields.get("sort", "relevance" if "text" in fields else "name"),
+                0,
+                args.limit,
+            )
+            results = {"full scan": timeit(lambda: full_scan(fields), args.repeat)}
+            for backend in backends:
+                app.config["CATALOG_SEARCH"] = backend
+                results[backend] = timeit(lambda: _search_catalog(query), args.repeat)
+            for implementation, result in results.items():
+                print(
+                    f"{hotels:<8}{name:<22}{implementation:<16}"
+                    f"{result['median_ms']:>12.2f}{result['min_ms']:>12.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Micro-benchmark of the "due by user / due by hotel" bar chart computations.
+
+Compares the reference loop (`_compute_booking_due_by`, a full scan dereferencing every booking)
+against the aggregation (`_aggregate_booking_due_by`, an indexed `$match` and `$group`).
+
+Usage:
+    python benchmarks/bench_due_by.py --bookings 20000 --host mongodb://localhost:27017
+"""
+from _common import connect, parser, seed, timeit
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=500)
+    arg_parser.add_argument("--hotels", type=int, default=50)
+    arg_parser.add_argument("--bookings", type=int, default=5000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    connect(args.host, args.db)
+    seed(args.users, args.hotels, args.bookings, args.seed)
+
+    import dashboard
+
+    targets = {"user": "User 0", "hotel": "Hotel 0"}
+    print(f"{'due by':<8}{'implementation':<28}{'median ms':>12}{'min ms':>12}")
+    for due_by, target in targets.items():
+        expected = dashboard._compute_booking_due_by(due_by, target)
+        assert dashboard._aggregate_booking_due_by(due_by, target) == expected
+        for name in ("_compute_booking_due_by", "_aggregate_booking_due_by"):
+            function = getattr(dashboard, name)
+            stats = timeit(lambda: function(due_by, target), args.repeat)
+            print(
+                f"{due_by:<8}{name:<28}{stats['median_ms']:>12.2f}{stats['min_ms']:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
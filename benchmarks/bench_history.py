@@ -0,0 +1,63 @@
+"""Benchmark of the booking history ("My Bookings") page as the history of a user grows.
+
+Seeds a single user with a growing number of bookings, and times reading the first page and a
+page in the middle of the history with `booking.booking_history()` (keyset pagination and a single
+`$in` prefetch of packages), against skip/offset pagination dereferencing each booking's package.
+
+Usage:
+    python benchmarks/bench_history.py --bookings 100 1000 10000 --limit 20 --host mongodb://localhost:27017
+"""
+from _common import connect, parser, seed, timeit
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--hotels", type=int, default=100)
+    arg_parser.add_argument(
+        "--bookings", type=int, nargs="+", default=[100, 1000, 10000]
+    )
+    arg_parser.add_argument("--limit", type=int, default=20, help="bookings per page")
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    connect(args.host, args.db)
+
+    from book import Booking, booking_history
+    from users import User
+
+    def offset_page(customer: User, skip: int) -> list:
+        bookings = list(
+            Booking.objects(customer=customer)
+            .order_by("-check_in_date", "-id")
+            .skip(skip)
+            .limit(args.limit)
+        )
+        # one dereference per booking
+        return [booking.package.image_url for booking in bookings]
+
+    print(
+        f"{'bookings':<10}{'page':<8}{'implementation':<18}{'median ms':>12}{'min ms':>12}"
+    )
+    for bookings in args.bookings:
+        seed(1, args.hotels, bookings, args.seed)
+        customer = User.objects.get()
+        # cursor of the page in the middle of the history
+        middle, after = bookings // 2, None
+        for _ in range(middle // args.limit):
+            _, after = booking_history(customer, after, args.limit)
+        for page, cursor, skip in (("first", None, 0), ("middle", after, middle)):
+            results = {
+                "keyset": timeit(
+                    lambda: booking_history(customer, cursor, args.limit), args.repeat
+                ),
+                "offset": timeit(lambda: offset_page(customer, skip), args.repeat),
+            }
+            for name, result in results.items():
+                print(
+                    f"{bookings:<10}{page:<8}{name:<18}"
+                    f"{result['median_ms']:>12.2f}{result['min_ms']:>12.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""End-to-end HTTP load benchmark of the main pages and dashboard endpoints.
+
+Seeds users, staycation packages and bookings at the requested scale (e.g. 1k to 1M bookings),
+then drives each endpoint through the Flask test client (default), or over HTTP through a local
+threaded WSGI server (`--server`), reporting p50/p95/p99 latency and requests per second.
+
+Results can be written to JSON (`--output`), and compared against an earlier run (`--baseline`):
+the benchmark fails if the p95 latency of any endpoint regresses by more than `--threshold`.
+
+Usage:
+    python benchmarks/bench_http.py --bookings 100000 --output results.json
+    python benchmarks/bench_http.py --bookings 100000 --baseline results.json --threshold 0.2
+    python benchmarks/bench_http.py --bookings 1000000 --server --concurrency 8 --host mongodb://localhost:27017
+"""
+import http.client
+import json
+import logging
+import random
+import sys
+import threading
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from _common import connect, load_app, parser, percentile, seed
+
+# a request, as (method, path, form data)
+Request = Tuple[str, str, Optional[dict]]
+
+
+def endpoints(users: int, hotels: int) -> Dict[str, Callable[[random.Random], Request]]:
+    """Build the requests to benchmark, by endpoint name, picking random users and hotels."""
+    return {
+        "login": lambda rng: (
+            "POST",
+            "/login",
+            {"email": f"user{rng.randrange(users)}@bench.com", "password": "12345"},
+        ),
+        "products": lambda rng: ("GET", "/products", None),
+        "view_hotel": lambda rng: (
+            "GET",
+            f"/view_hotel={quote(f'Hotel {rng.randrange(hotels)}')}",
+            None,
+        ),
+        "trend_chart": lambda rng: ("POST", "/dashboard/trend_chart", {}),
+        "bar_chart_by_user": lambda rng: (
+            "POST",
+            "/dashboard/bar_chart_by_user",
+            {"username": f"User {rng.randrange(users)}"},
+        ),
+        "bar_chart_by_hotel": lambda rng: (
+            "POST",
+            "/dashboard/bar_chart_by_hotel",
+            {"hotelname": f"Hotel {rng.randrange(hotels)}"},
+        ),
+        "bookings": lambda rng: ("GET", "/bookings", None),
+    }
+
+
+class TestClientSession:
+    """Session sending requests through the Flask test client, without a network round trip."""
+
+    def __init__(self, app) -> None:
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, data: Optional[dict]) -> int:
+        return self.client.open(path, method=method, data=data).status_code
+
+
+class HttpSession:
+    """Session sending requests over HTTP to a local server, keeping the session cookie."""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self.cookie: Optional[str] = None
+
+    def request(self, method: str, path: str, data: Optional[dict]) -> int:
+        headers = {"Cookie": self.cookie} if self.cookie else {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        connection = http.client.HTTPConnection("127.0.0.1", self.port)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            cookie = response.getheader("Set-Cookie")
+            if cookie:
+                self.cookie = cookie.split(";", 1)[0]
+            return response.status
+        finally:
+            connection.close()
+
+
+def run_endpoint(
+    new_session: Callable[[], object],
+    build: Callable[[random.Random], Request],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> Dict[str, float]:
+    """Send `requests` requests to one endpoint from `concurrency` logged in sessions.
+
+    Returns:
+        Dict[str, float]: Number of requests and errors, p50/p95/p99 latency (ms) and requests per second.
+    """
+    timings: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(index: int, count: int) -> None:
+        rng = random.Random(seed + index)
+        session = new_session()
+        # sessions log in first, as most pages require a logged in user
+        session.request(
+            "POST", "/login", {"email": f"user{index}@bench.com", "password": "12345"}
+        )
+        for _ in range(warmup):
+            session.request(*build(rng))
+        local, failed = [], 0
+        for _ in range(count):
+            start = perf_counter()
+            try:
+                failed += session.request(*build(rng)) >= 400
+            except Exception:
+                failed += 1
+            local.append((perf_counter() - start) * 1000)
+        with lock:
+            timings.extend(local)
+            errors[0] += failed
+
+    counts = [
+        requests // concurrency + (i < requests % concurrency)
+        for i in range(concurrency)
+    ]
+    threads = [
+        threading.Thread(target=worker, args=(i, count))
+        for i, count in enumerate(counts)
+    ]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = perf_counter() - start
+    return {
+        "requests": len(timings),
+        "errors": errors[0],
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+        "rps": len(timings) / seconds,
+    }
+
+
+def regressions(
+    results: Dict[str, dict], baseline: Dict[str, dict], threshold: float
+) -> List[str]:
+    """List the endpoints whose p95 latency is more than `threshold` (fraction) above the baseline."""
+    return [
+        f"{name}: p95 {result['p95_ms']:.2f} ms vs {baseline[name]['p95_ms']:.2f} ms"
+        for name, result in results.items()
+        if name in baseline
+        and result["p95_ms"] > baseline[name]["p95_ms"] * (1 + threshold)
+    ]
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=1000)
+    arg_parser.add_argument("--hotels", type=int, default=100)
+    arg_parser.add_argument("--bookings", type=int, default=10000)
+    arg_parser.add_argument(
+        "--requests", type=int, default=200, help="requests per endpoint"
+    )
+    arg_parser.add_argument("--concurrency", type=int, default=1)
+    arg_parser.add_argument(
+        "--warmup", type=int, default=5, help="untimed requests per session"
+    )
+    arg_parser.add_argument(
+        "--endpoints", nargs="+", help="endpoints to benchmark, defaults to all"
+    )
+    arg_parser.add_argument(
+        "--server", action="store_true", help="send requests over HTTP"
+    )
+    arg_parser.add_argument("--output", help="write results to this JSON file")
+    arg_parser.add_argument("--baseline", help="JSON results of an earlier run")
+    arg_parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed p95 regression"
+    )
+    args = arg_parser.parse_args()
+
+    connect(args.host, args.db)
+    seed(args.users, args.hotels, args.bookings, args.seed)
+    app = load_app()
+    # forms are posted directly, without first rendering the page holding the CSRF token
+    app.config["WTF_CSRF_ENABLED"] = False
+    # every session logs in from the same address, which would soon be rate limited
+    app.config["RATE_LIMIT_ENABLED"] = False
+
+    if args.server:
+        from werkzeug.serving import make_server
+
+        # no access log, so the results are not drowned in request lines
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        new_session = lambda: HttpSession(server.server_port)  # noqa: E731
+    else:
+        new_session = lambda: TestClientSession(app)  # noqa: E731
+
+    requests = endpoints(args.users, args.hotels)
+    results = {}
+    print(
+        f"{'endpoint':<22}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}"
+    )
+    for name in args.endpoints or requests:
+        result = run_endpoint(
+            new_session,
+            requests[name],
+            args.requests,
+            min(args.concurrency, args.users),
+            args.warmup,
+            args.seed,
+        )
+        results[name] = result
+        print(
+            f"{name:<22}{result['requests']:>10}{result['errors']:>8}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['rps']:>10.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(
+                {
+                    "created_at": datetime.utcnow().isoformat(),
+                    "config": {
+                        key: getattr(args, key)
+                        for key in (
+                            "host",
+                            "users",
+                            "hotels",
+                            "bookings",
+                            "requests",
+                            "concurrency",
+                            "server",
+                        )
+                    },
+                    "endpoints": results,
+                },
+                output,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressed = regressions(
+                results, json.load(baseline)["endpoints"], args.threshold
+            )
+        for line in regressed:
+            print(f"regression: {line}")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Stress test of room reservations, with concurrent bookings of the same hotel and date.
+
+Every thread books the same staycation package on the same check-in date, so all reservations race
+on a single inventory document. The number of successful bookings must equal the number of rooms.
+Thread-level atomicity is only guaranteed by a real MongoDB server, so run with `--host`.
+
+Usage:
+    python benchmarks/bench_inventory.py --rooms 50 --threads 16 --attempts 200 --host mongodb://localhost:27017
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from time import perf_counter
+
+from _common import connect, parser, seed
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--rooms", type=int, default=50)
+    arg_parser.add_argument("--threads", type=int, default=16)
+    arg_parser.add_argument("--attempts", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    connect(args.host, args.db)
+    seed(args.attempts, 1, 0, args.seed)
+
+    from book import Booking, create_booking
+    from inventory import RoomInventory, SoldOutError
+    from staycation import Staycation
+    from users import User
+
+    RoomInventory.drop_collection()
+    Staycation.objects(hotel_name="Hotel 0").update(set__rooms=args.rooms)
+    package = Staycation.objects.get(hotel_name="Hotel 0")
+    customers = list(User.objects.only("id"))
+    check_in_date = date(2022, 6, 1)
+
+    def attempt(index: int) -> bool:
+        try:
+            create_booking(customers[index], package, check_in_date, f"bench-{index}")
+            return True
+        except SoldOutError:
+            return False
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        booked = sum(executor.map(attempt, range(args.attempts)))
+    seconds = perf_counter() - start
+
+    saved = Booking.objects(package=package, check_in_date=check_in_date).count()
+    available = RoomInventory.availability(package, 2022, 6).get("2022-06-01", 0)
+    print(f"{'attempts':<12}{'booked':>8}{'saved':>8}{'left':>8}{'ms/attempt':>12}")
+    print(
+        f"{args.attempts:<12}{booked:>8}{saved:>8}{available:>8}"
+        f"{seconds * 1000 / args.attempts:>12.2f}"
+    )
+    expected = min(args.rooms, args.attempts)
+    assert booked == saved == expected, "inventory oversold or undersold"
+    assert available == args.rooms - expected, "inventory out of sync with bookings"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Micro-benchmark of the "Total Income" trend chart computations.
+
+Compares the reference loop (`_compute_daily_booking_income`, a full scan dereferencing every booking)
+against the daily revenue rollup (`DailyRevenue.income_by_hotel`, one document per package and date),
+and times the whole chart payload (`_trend_chart_payload`) read from the rollup.
+
+Usage:
+    python benchmarks/bench_trend_chart.py --bookings 20000 --host mongodb://localhost:27017
+"""
+from _common import connect, parser, seed, timeit
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=500)
+    arg_parser.add_argument("--hotels", type=int, default=50)
+    arg_parser.add_argument("--bookings", type=int, default=5000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    connect(args.host, args.db)
+    seed(args.users, args.hotels, args.bookings, args.seed)
+
+    import dashboard
+    from book import Booking, DailyRevenue
+
+    expected = dashboard._compute_daily_booking_income(Booking.objects.all())
+    assert DailyRevenue.income_by_hotel() == expected
+    implementations = {
+        "_compute_daily_booking_income": lambda: dashboard._compute_daily_booking_income(
+            Booking.objects.all()
+        ),
+        "DailyRevenue.income_by_hotel": DailyRevenue.income_by_hotel,
+        "_trend_chart_payload": dashboard._trend_chart_payload,
+    }
+    print(f"{'implementation':<32}{'median ms':>12}{'min ms':>12}")
+    for name, function in implementations.items():
+        stats = timeit(function, args.repeat)
+        print(f"{name:<32}{stats['median_ms']:>12.2f}{stats['min_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
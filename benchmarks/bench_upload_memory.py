@@ -0,0 +1,65 @@
+"""Benchmark of peak memory when streaming uploaded CSV files, plain and gzip-compressed.
+
+Each file is read the way upload jobs read spooled files (`ingest.read_csv_rows`, in chunks of
+`--batch-size` rows), and the peak memory allocated is measured with `tracemalloc`. Peak memory
+should stay flat as the file grows; the benchmark fails if the largest file peaks at more than
+`--tolerance` times the smallest.
+
+Usage:
+    python benchmarks/bench_upload_memory.py --megabytes 1 16 128
+"""
+import gzip
+import os
+import tempfile
+import tracemalloc
+
+from _common import parser
+
+ROW = "2022-01-27,user{0}@bench.com,Hotel {1}\n"
+
+
+def write_booking_csv(path: str, megabytes: int, compress: bool) -> None:
+    """Write a synthetic booking CSV file of roughly `megabytes` MB (uncompressed)."""
+    opener = gzip.open if compress else open
+    with opener(path, "wt", newline="", encoding="utf-8") as csv_file:
+        csv_file.write("check_in_date,customer,hotel_name\n")
+        written, i = 0, 0
+        while written < megabytes * 1024 * 1024:
+            row = ROW.format(i, i % 100)
+            csv_file.write(row)
+            written += len(row)
+            i += 1
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--megabytes", type=int, nargs="+", default=[1, 16, 64])
+    arg_parser.add_argument("--batch-size", type=int, default=1000)
+    arg_parser.add_argument("--tolerance", type=float, default=1.5)
+    args = arg_parser.parse_args()
+
+    from ingest import _chunked, read_csv_rows
+
+    print(f"{'file':<14}{'MB':>6}{'rows':>12}{'peak KB':>10}")
+    for compress in (False, True):
+        peaks = []
+        for megabytes in args.megabytes:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "booking.csv")
+                write_booking_csv(path, megabytes, compress)
+                tracemalloc.start()
+                rows = sum(
+                    len(chunk)
+                    for chunk in _chunked(read_csv_rows(path), args.batch_size)
+                )
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            name = "booking.csv.gz" if compress else "booking.csv"
+            print(f"{name:<14}{megabytes:>6}{rows:>12}{peaks[-1] / 1024:>10.0f}")
+        assert (
+            peaks[-1] <= peaks[0] * args.tolerance
+        ), "peak memory grows with file size"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark of bulk user uploads, scaling password hashing by number of worker processes.
+
+Password hashing alone is first timed per chunk size, serially and in a warm pool of each number of
+workers (the pool start-up time is reported separately), to show from which chunk size the pool
+beats serial hashing rather than mostly paying IPC. Whole uploads are then timed end to end.
+
+Usage:
+    python benchmarks/bench_user_upload.py --users 20000 --workers 1 2 4 8
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import List, Tuple
+
+from _common import connect, parser
+
+
+def _time_hashing(workers: int, chunk_sizes: List[int]) -> Tuple[float, List[float]]:
+    """Time hashing a chunk of each size, serially for 1 worker, else in a warm pool, as
+    `BulkIngestor` does. Returns the pool start-up time and the time per chunk, in seconds."""
+    from passwords import hash_passwords
+
+    chunks = [[f"password{i}" for i in range(size)] for size in chunk_sizes]
+    if workers == 1:
+        timings = []
+        for passwords in chunks:
+            start = perf_counter()
+            hash_passwords(passwords)
+            timings.append(perf_counter() - start)
+        return 0.0, timings
+    start = perf_counter()
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        # wait for all workers to start and import `passwords`
+        list(executor.map(hash_passwords, [["warm-up"]] * workers))
+        startup = perf_counter() - start
+        timings = []
+        for passwords in chunks:
+            size = -(-len(passwords) // workers)
+            slices = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+            start = perf_counter()
+            list(executor.map(hash_passwords, slices))
+            timings.append(perf_counter() - start)
+    return startup, timings
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=10000)
+    arg_parser.add_argument("--batch-size", type=int, default=1000)
+    arg_parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="numbers of hashing processes to compare",
+    )
+    arg_parser.add_argument(
+        "--chunk-sizes",
+        type=int,
+        nargs="+",
+        default=[100, 500, 1000, 5000],
+        help="numbers of passwords per chunk to time hashing of",
+    )
+    args = arg_parser.parse_args()
+
+    connect(args.host, args.db)
+
+    from ingest import BulkIngestor
+    from users import User
+
+    print(
+        "hashing only, ms per chunk and speed-up over serial (pool start-up excluded)"
+    )
+    print(
+        f"{'workers':>8}{'start-up':>10}"
+        + "".join(f"{n:>14}" for n in args.chunk_sizes)
+    )
+    serial = None
+    for workers in args.workers:
+        startup, timings = _time_hashing(workers, args.chunk_sizes)
+        serial = serial or timings
+        print(
+            f"{workers:>8}{startup * 1000:>10.0f}"
+            + "".join(
+                f"{seconds * 1000:>8.1f}{baseline / seconds:>5.1f}x"
+                for seconds, baseline in zip(timings, serial)
+            )
+        )
+
+    rows = [
+        {"email": f"user{i}@bench.com", "password": f"password{i}", "name": f"User {i}"}
+        for i in range(args.users)
+    ]
+    print("\nwhole upload")
+    print(f"{'workers':>8}{'seconds':>10}{'rows/s':>12}{'speed-up':>10}")
+    baseline = None
+    for workers in args.workers:
+        User.drop_collection()
+        report = BulkIngestor("users", args.batch_size, hash_workers=workers).ingest(
+            rows
+        )
+        assert report.inserted == args.users
+        baseline = baseline or report.rows_per_second
+        print(
+            f"{workers:>8}{report.seconds:>10.2f}{report.rows_per_second:>12.0f}"
+            f"{report.rows_per_second / baseline:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark of throughput scaling by number of gunicorn worker processes.
+
+Seeds a MongoDB database, then serves the app with gunicorn (`gunicorn.conf.py`, as `start.sh` does
+in production) at each number of workers, driving the selected endpoints over HTTP from concurrent
+sessions, and reporting requests per second and latency for each number of workers.
+
+Worker processes cannot share an in-memory `mongomock` database, so a running MongoDB is required.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --threads 4 --concurrency 16 --host mongodb://localhost:27017
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from _common import ROOT, connect, parser, seed
+from bench_http import HttpSession, endpoints, run_endpoint
+
+
+def database_uri(host: str, db: str) -> str:
+    """Connection URI of the benchmark database, for the app config (`MONGODB_HOST`)."""
+    parts = urlsplit(host)
+    return urlunsplit(parts._replace(path=f"/{db}"))
+
+
+def wait_until_ready(port: int, timeout: float = 30.0) -> None:
+    """Wait for the server on `port` to answer requests."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            HttpSession(port).request("GET", "/login", None)
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def main() -> None:
+    arg_parser = parser(__doc__.splitlines()[0])
+    arg_parser.add_argument("--users", type=int, default=1000)
+    arg_parser.add_argument("--hotels", type=int, default=100)
+    arg_parser.add_argument("--bookings", type=int, default=10000)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    arg_parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument(
+        "--requests", type=int, default=400, help="requests per endpoint"
+    )
+    arg_parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        default=["products", "view_hotel", "trend_chart", "bar_chart_by_hotel"],
+    )
+    arg_parser.add_argument("--port", type=int, default=5100)
+    arg_parser.add_argument("--output", help="write results to this JSON file")
+    args = arg_parser.parse_args()
+    if args.host.startswith("mongomock://"):
+        arg_parser.error("gunicorn workers cannot share a mongomock database")
+
+    connect(args.host, args.db)
+    seed(args.users, args.hotels, args.bookings, args.seed)
+
+    # forms are posted directly, without first rendering the page holding the CSRF token,
+    # and every session logs in from the same address, which would soon be rate limited
+    with tempfile.NamedTemporaryFile("w", suffix=".cfg", delete=False) as config:
+        config.write("WTF_CSRF_ENABLED = False\nRATE_LIMIT_ENABLED = False\n")
+    requests = endpoints(args.users, args.hotels)
+    results = {}
+    print(
+        f"{'workers':<9}{'endpoint':<22}{'rps':>10}{'speedup':>9}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+    )
+    try:
+        for workers in args.workers:
+            environment = {
+                **os.environ,
+                "PYTHONPATH": os.path.join(ROOT, "app"),
+                "APP_ENV": "production",
+                "APP_CONFIG": config.name,
+                "MONGODB_HOST": database_uri(args.host, args.db),
+                "WEB_CONCURRENCY": str(workers),
+                "GUNICORN_THREADS": str(args.threads),
+                "PORT": str(args.port),
+            }
+            server = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "gunicorn",
+                    "--config",
+                    "gunicorn.conf.py",
+                    "--access-logfile",
+                    os.devnull,
+                    "wsgi:app",
+                ],
+                cwd=ROOT,
+                env=environment,
+            )
+            try:
+                wait_until_ready(args.port)
+                results[workers] = {}
+                for name in args.endpoints:
+                    result = run_endpoint(
+                        lambda: HttpSession(args.port),
+                        requests[name],
+                        args.requests,
+                        min(args.concurrency, args.users),
+                        5,
+                        args.seed,
+                    )
+                    results[workers][name] = result
+                    speedup = result["rps"] / results[args.workers[0]][name]["rps"]
+                    print(
+                        f"{workers:<9}{name:<22}{result['rps']:>10.1f}{speedup:>8.2f}x"
+                        f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['errors']:>8}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        os.remove(config.name)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"threads": args.threads, "workers": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import multiprocessing
+import os
+
+# gunicorn settings for `start.sh` in production, see https://docs.gunicorn.org/en/stable/settings.html
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# worker processes, each serving `threads` requests concurrently (requests mostly wait on MongoDB)
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+# the app is imported once and inherited by the forked workers; MongoDB connections are only
+# opened on the first query (`connect=False` in app config), so each worker opens its own
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# restart workers periodically, with jitter so they do not all restart at once
+max_requests = 10000
+max_requests_jitter = 1000
+accesslog = "-"
+
+
+def post_worker_init(worker) -> None:
+    """Fail the uploads left unfinished by the worker this one replaces, e.g. after `max_requests`."""
+    from jobs import fail_interrupted_jobs
+
+    fail_interrupted_jobs()
@@ -1,4 +1,18 @@
 export PYTHONPATH=./app
 export FLASK_APP=./app/app.py
 export FLASK_ENV=production
-flask run --host "0.0.0.0"
+# configuration profile of the app, "production" (gunicorn) or "development" (flask dev server)
+export APP_ENV=${APP_ENV:-production}
+# create and verify the database indexes before serving requests
+flask ensure-indexes
+# fail the uploads left unfinished when the app last stopped, and remove their spooled files
+flask fail-interrupted-uploads --all-workers
+# backfill the snapshot fields of bookings written before they existed (a no-op once done)
+flask backfill-bookings
+if [ "$APP_ENV" = "production" ]; then
+    # fingerprint and precompress the static assets, served with long-lived cache headers
+    flask build-assets
+    exec gunicorn --config gunicorn.conf.py wsgi:app
+else
+    flask run --host "0.0.0.0"
+fi
@@ -0,0 +1,3 @@
+# WSGI entry point for production servers, e.g. `gunicorn --config gunicorn.conf.py wsgi:app`
+# requires `PYTHONPATH=./app`, as for `flask run` (see `start.sh`)
+from app.app import app  # noqa: F401, importing `app/app.py` registers all routes